@@ -0,0 +1,113 @@
+"""Admission control: a cap on concurrent analyses with a bounded wait queue"""
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from instrumentation import METRICS_ENABLED, registry
+
+# Analyses allowed to run at once (across job workers and batches), analyses allowed to wait
+# for a slot, and how long a batch file waits before it is turned away. These are per process:
+# serve.py divides the first two between its workers
+MAX_IN_FLIGHT = int(os.environ.get('FINANCIAL_ANALYZER_MAX_IN_FLIGHT', 0)) or (os.cpu_count() or 1)
+MAX_WAITING = int(os.environ.get('FINANCIAL_ANALYZER_MAX_WAITING', 32))
+ADMISSION_TIMEOUT = float(os.environ.get('FINANCIAL_ANALYZER_ADMISSION_TIMEOUT', 30))
+
+# Seconds an analysis is assumed to take until one has been timed, and the longest Retry-After sent
+INITIAL_SERVICE_TIME = 2.0
+MAX_RETRY_AFTER = 300
+
+
+class Saturated(Exception):
+    """No capacity for the request: status is 429 (wait queue full) or 503 (waited too long)"""
+
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """At most max_in_flight analyses run at once, and up to max_waiting more wait for a slot.
+
+    acquire() takes a slot, waiting if none is free, and release() gives it
+    back - possibly from another thread, so a request thread can admit work
+    that a pool thread runs. A caller that finds max_waiting others already
+    waiting is refused at once (429); one that waits longer than its timeout
+    is refused then (503). Either way the Saturated error carries a Retry-After
+    estimate from the recent run time of analyses and the backlog ahead.
+    """
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, max_waiting=MAX_WAITING):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_waiting = max_waiting
+        self.in_flight = 0
+        self.waiting = 0
+        self._service_time = INITIAL_SERVICE_TIME
+        self._changed = threading.Condition()
+
+    def check(self):
+        """Raise Saturated (429) if new work would find the wait queue full"""
+        with self._changed:
+            if self.in_flight >= self.max_in_flight and self.waiting >= self.max_waiting:
+                raise self._saturated("Too many analyses waiting, please retry later", 429)
+
+    def acquire(self, timeout=None, reject=True, queue='analysis'):
+        """Take a slot and return the seconds spent waiting for it.
+
+        With reject False the caller is never refused for a full wait queue -
+        for work that was already accepted elsewhere, such as queued jobs.
+        """
+        start = time.perf_counter()
+        with self._changed:
+            if self.in_flight >= self.max_in_flight:
+                if reject and self.waiting >= self.max_waiting:
+                    raise self._saturated("Too many analyses waiting, please retry later", 429)
+                self.waiting += 1
+                try:
+                    admitted = self._changed.wait_for(lambda: self.in_flight < self.max_in_flight, timeout)
+                finally:
+                    self.waiting -= 1
+                if not admitted:
+                    raise self._saturated("Server busy, please try again shortly", 503)
+            self.in_flight += 1
+        waited = time.perf_counter() - start
+        if METRICS_ENABLED:
+            registry.observe('financial_analyzer_queue_wait_seconds', waited, queue=queue)
+        return waited
+
+    def release(self, run_seconds=None):
+        """Give a slot back; run_seconds (how long the work ran) refines Retry-After estimates"""
+        with self._changed:
+            self.in_flight -= 1
+            if run_seconds is not None:
+                self._service_time = 0.8 * self._service_time + 0.2 * run_seconds
+            self._changed.notify()
+
+    @contextmanager
+    def slot(self, timeout=None, reject=True, queue='analysis'):
+        """acquire() for the with block, yielding the seconds waited"""
+        waited = self.acquire(timeout, reject, queue)
+        start = time.perf_counter()
+        try:
+            yield waited
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def retry_after(self, ahead=None):
+        """Whole seconds until a slot is likely to be free with `ahead` analyses in front"""
+        with self._changed:
+            return self._retry_after(ahead)
+
+    def _retry_after(self, ahead=None):
+        if ahead is None:
+            ahead = self.in_flight + self.waiting
+        estimate = self._service_time * (ahead + 1) / self.max_in_flight
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(estimate)))
+
+    def _saturated(self, message, status):
+        """The Saturated error to raise; called with the lock held"""
+        if METRICS_ENABLED:
+            registry.increment('financial_analyzer_rejected_total', status=str(status))
+        return Saturated(message, status, self._retry_after())
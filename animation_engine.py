@@ -0,0 +1,172 @@
+"""Blitted chart animations for the Tk front ends: the static parts of a chart are rendered once"""
+from lazy_import import lazy_import
+
+np = lazy_import('numpy')
+
+# Milliseconds between frames unless the caller picks a speed
+DEFAULT_INTERVAL = 50
+
+
+def _flatten(artists):
+    """Artists from func's return value; containers such as ax.bar()'s BarContainer are expanded"""
+    for item in artists or ():
+        if hasattr(item, 'draw'):
+            yield item
+        else:
+            yield from _flatten(item)
+
+
+class BlitAnimation:
+    """Plays func(frame) on fig, redrawing only the artists it changes.
+
+    func works as it does for FuncAnimation(blit=True): it updates some
+    artists - bar heights, line data, scatter offsets, label text - and returns
+    them (containers are flattened). Those artists are marked animated, so a
+    full draw of the figure leaves them out; that draw is kept as the
+    background, and each frame restores it, draws just the animated artists on
+    top and blits. Axes, ticks, grid and titles are therefore rendered once per
+    layout instead of once per frame. Any full draw - the first one, a resize,
+    a canvas.draw() - takes a fresh background. An artist func returns for the
+    first time joins the animated set at the cost of one full draw. As with
+    any blitting, the background (grid lines included) always ends up under
+    the animated artists, whatever the zorders say.
+
+    Frames run 0..frames-1 (then again from 0 with repeat) every interval ms.
+    The timer starts at the figure's first draw, so an animation can be built
+    before the figure is put on its canvas. With blit=False every frame is a
+    full draw, as with FuncAnimation(blit=False).
+    """
+
+    def __init__(self, fig, func, frames, interval=DEFAULT_INTERVAL, repeat=True, blit=True):
+        self.fig = fig
+        self.func = func
+        self.frames = frames
+        self.interval = interval
+        self.repeat = repeat
+        self.blit = blit
+        self.frame = 0
+        self.artists = []
+        self.running = True
+        self._animated = set()
+        self._background = None
+        self._timer = None
+        self._cids = [fig.canvas.mpl_connect('draw_event', self._on_draw),
+                      fig.canvas.mpl_connect('resize_event', self._on_resize)]
+        # Draw the first frame now, so its artists are kept out of the first background
+        self.step()
+
+    def step(self):
+        """Show the next frame (what the timer calls)"""
+        if self.frame >= self.frames:
+            if not self.repeat:
+                self.stop()
+                return
+            self.frame = 0
+        added = self._track(self.func(self.frame))
+        self.frame += 1
+
+        canvas = self.fig.canvas
+        if not self.blit or added or self._background is None or not canvas.supports_blit:
+            canvas.draw_idle()
+            return
+        canvas.restore_region(self._background)
+        self._draw_artists()
+        canvas.blit(self.fig.bbox)
+
+    def pause(self):
+        self.running = False
+        if self._timer is not None:
+            self._timer.stop()
+
+    def resume(self):
+        self.running = True
+        if self._timer is not None:
+            self._timer.start()
+
+    def stop(self):
+        """Stop for good, leaving the current frame drawn as part of the figure"""
+        self.pause()
+        for cid in self._cids:
+            self.fig.canvas.mpl_disconnect(cid)
+        self._cids = []
+        for artist in self._animated:
+            artist.set_animated(False)
+        self._animated.clear()
+        self._background = None
+        self.fig.canvas.draw_idle()
+
+    def _track(self, returned):
+        """Note the artists func returned; True if any of them is new to the animated set"""
+        self.artists = list(_flatten(returned))
+        new = [artist for artist in self.artists if artist not in self._animated]
+        for artist in new:
+            self._animated.add(artist)
+            artist.set_animated(self.blit)
+        return bool(new) and self.blit
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            if artist.figure is not None:
+                self.fig.draw_artist(artist)
+
+    def _on_draw(self, event):
+        if self._timer is None and self.running and self._cids:
+            self._timer = self.fig.canvas.new_timer(interval=self.interval)
+            self._timer.add_callback(self.step)
+            self._timer.start()
+        if self.blit and self.fig.canvas.supports_blit:
+            self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+            # The full draw left the animated artists out; put them back for this frame
+            self._draw_artists()
+
+    def _on_resize(self, event):
+        # The old background is the wrong size; the draw that follows a resize takes a new one
+        self._background = None
+
+
+class ParticleSystem:
+    """Particles flowing along bars - up them, or along horizontal bars with axis=0 - and wrapping to 0 at the end.
+
+    per_bar particles per bar start at random points along it (values gives
+    each bar's length), spread sideways by up to spread, and move a random
+    speed within speed_range each step.
+    All state is in NumPy arrays; step() moves every particle with a few
+    in-place vectorised operations, so a frame costs the same handful of calls
+    however many particles there are. Once attach()ed, step() hands the new
+    positions to the scatter with set_offsets() - one array copy per frame.
+    """
+
+    def __init__(self, values, per_bar, spread, speed_range, axis=1, sizes=None, rng=None):
+        rng = rng or np.random.default_rng()
+        values = np.asarray(values, dtype=float)
+        self.bar = np.repeat(np.arange(len(values)), per_bar)
+        count = len(self.bar)
+        self.axis = axis
+        self.limits = values[self.bar]
+        self.speeds = rng.uniform(speed_range[0], speed_range[1], count)
+        self.sizes = None if sizes is None else rng.uniform(sizes[0], sizes[1], count)
+        self._mask = np.empty(count, dtype=bool)
+        self._scatter = None
+        self.positions = np.empty((count, 2))
+        self._along = self.positions[:, axis]
+        self.positions[:, 1 - axis] = self.bar + rng.uniform(-spread, spread, count)
+        self._along[:] = rng.uniform(0, self.limits)
+
+    def colors(self, palette):
+        """One colour per particle, its bar's colour from palette"""
+        return [palette[i % len(palette)] for i in self.bar]
+
+    def attach(self, scatter):
+        """Draw the particles with scatter from now on, updating its offsets every step()"""
+        scatter.set_offsets(self.positions)
+        self._scatter = scatter
+        return scatter
+
+    def step(self):
+        """Move every particle one step, back to 0 past the end of its bar"""
+        along = self._along
+        along += self.speeds
+        np.greater(along, self.limits, out=self._mask)
+        np.copyto(along, 0.0, where=self._mask)
+        if self._scatter is not None:
+            self._scatter.set_offsets(self.positions)
@@ -1,52 +1,89 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Request, render_template, request, jsonify, url_for, make_response, Response, stream_with_context
 import os
-import PyPDF2
-import re
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import io
-import base64
+import functools
+import json
 import socket
+import tempfile
+from admission import ADMISSION_TIMEOUT, AdmissionController, Saturated
+from batch_upload import BATCH_WORKERS, batch_inputs, run_batch
+from chart_renderer import cached_chart, chart_exists, chart_spec, deferred_chart, load_chart
+from disk_cache import sha256_of
+from document_classifier import is_financial
+from instrumentation import CONTENT_TYPE, StageTimer, record_document, registry, stage
+from job_queue import JOB_QUEUE_DEPTH, JOB_WORKERS, JobQueue, QueueFull
+from job_store import job_store
+from pdf_extraction import PAGE_BUDGET, extract_pages, iter_pages, join_pages
+from metric_patterns import METRIC_PATTERNS
+from report_stream import SentenceCounter, StreamingMetricExtractor, read_pages
+from result_cache import result_cache, result_key
+
+class AnalyzerRequest(Request):
+    @property
+    def max_content_length(self):
+        # A batch holds many files, so it gets its own (larger) request size limit
+        if self.endpoint == 'upload_batch':
+            return app.config['BATCH_MAX_CONTENT_LENGTH']
+        return super().max_content_length
 
 app = Flask(__name__)
+app.request_class = AnalyzerRequest
 app.config['UPLOAD_FOLDER'] = 'uploads/'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+# Uploads are spooled to disk and the PDF memory-mapped, so large reports needn't fit in memory
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('FINANCIAL_ANALYZER_MAX_UPLOAD_MB', 512)) * 1024 * 1024
+app.config['BATCH_MAX_CONTENT_LENGTH'] = int(os.environ.get('FINANCIAL_ANALYZER_BATCH_MAX_MB', 1024)) * 1024 * 1024
+app.config['BATCH_WORKERS'] = BATCH_WORKERS
+app.config['JOB_WORKERS'] = JOB_WORKERS
+app.config['JOB_QUEUE_DEPTH'] = JOB_QUEUE_DEPTH
+# Seconds a batch file waits for an analysis slot before it is turned away
+app.config['ADMISSION_TIMEOUT'] = ADMISSION_TIMEOUT
+# Seconds between keep-alive comments on an idle event stream
+app.config['EVENT_HEARTBEAT'] = 15
+# How results carry the chart unless a request asks (?chart=): 'png' renders it on the server,
+# 'spec' sends a chart spec for the browser to draw and renders the PNG only if it is fetched
+CHART_MODES = ('png', 'spec')
+app.config['CHART_MODE'] = os.environ.get('FINANCIAL_ANALYZER_CHART_MODE', 'png')
+# Bump when analyze() would return something different for the same PDF, so cached results are recomputed
+ANALYSIS_VERSION = 1
 
 class FinancialReportAnalyzer:
     def extract_text_from_pdf(self, pdf_file):
         try:
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            text = ""
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
+            text = join_pages(extract_pages(pdf_file))
             return text if text.strip() else "No readable text found in PDF"
         except Exception as e:
             return f"Error reading PDF: {str(e)}"
     
+    def read_report(self, pdf_file, progress=None):
+        """Stream the PDF page by page, stopping once the metrics and summary are settled.
+
+        Returns (text, metrics, sources); sources gives each metric's page and character offsets.
+        progress(pages_read, page_text, metrics_so_far) is called after each page. A PDF
+        that can't be read raises ValueError, so the failure is reported rather than cached.
+        """
+        extractor = StreamingMetricExtractor(METRIC_PATTERNS['web'])
+        # Parsing and matching alternate page by page, so each is timed across the whole read
+        extract_timer = StageTimer('extract_text')
+        metrics_timer = StageTimer('extract_metrics')
+        on_page = (lambda pages_read, page_text: progress(pages_read, page_text, extractor.metrics())) if progress else None
+        pages_read = 0
+        try:
+            pages = extract_timer.iterate(iter_pages(pdf_file, max_pages=PAGE_BUDGET))
+            text, pages_read = read_pages(pages, extractor, summary=SentenceCounter(), progress=on_page,
+                                          feed_timer=metrics_timer)
+        except Exception as e:
+            raise ValueError(f"Error reading PDF: {str(e)}") from e
+        finally:
+            extract_timer.record()
+            metrics_timer.record()
+            record_document(pdf_file, pages_read, extract_timer.elapsed)
+        if not text.strip():
+            text = "No readable text found in PDF"
+        return text, extractor.metrics(), extractor.sources()
+    
     def extract_financial_metrics(self, text):
-        metrics = {}
-        
-        financial_terms = {
-            'revenue': [r'revenue.*?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)', r'sales.*?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'],
-            'net_income': [r'net income.*?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)', r'net profit.*?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'],
-            'assets': [r'total assets.*?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'],
-            'profit': [r'profit.*?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)']
-        }
-        
-        for metric, patterns in financial_terms.items():
-            for pattern in patterns:
-                matches = re.findall(pattern, text, re.IGNORECASE)
-                if matches:
-                    try:
-                        value = float(matches[0].replace(',', ''))
-                        metrics[metric] = value
-                        break
-                    except:
-                        continue
-        return metrics
+        extractor = StreamingMetricExtractor(METRIC_PATTERNS['web'])
+        extractor.feed(text)
+        return extractor.metrics()
     
     def generate_summary(self, text):
         if len(text) < 100:
@@ -60,43 +97,169 @@ class FinancialReportAnalyzer:
         return summary
     
     def create_chart(self, metrics):
+        """Render the metrics chart (or reuse an identical one) and return its URL"""
         if not metrics:
             return None
             
         try:
-            fig, ax = plt.subplots(figsize=(10, 6))
-            names = [name.replace('_', ' ').title() for name in metrics.keys()]
-            values = list(metrics.values())
-            
-            bars = ax.bar(names, values, color=['#3498db', '#2ecc71', '#e74c3c'])
-            ax.set_title('Financial Metrics', fontweight='bold')
-            ax.set_ylabel('Amount ($)')
-            
-            for bar in bars:
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                       f'${height:,.0f}', ha='center', va='bottom', fontweight='bold')
-            
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-            buf.seek(0)
-            chart_data = base64.b64encode(buf.getvalue()).decode('utf-8')
-            plt.close()
-            
-            return chart_data
+            # Rendered on a pooled Figure, not pyplot, so concurrent jobs don't collide
+            key = cached_chart('metrics_bar', metrics, dpi=150)
+            return chart_url(key)
         except Exception as e:
             print(f"Chart error: {e}")
             return None
+    
+    def chart_fields(self, metrics, chart_mode='png'):
+        """The chart part of a result: chart_url, plus in 'spec' mode the chart spec itself.
+
+        In 'spec' mode nothing is drawn here; chart_url still works, rendering
+        the PNG the first time it is fetched.
+        """
+        if chart_mode != 'spec':
+            return {'chart_url': self.create_chart(metrics)}
+        if not metrics:
+            return {'chart_url': None, 'chart': None}
+        return {
+            'chart_url': chart_url(deferred_chart('metrics_bar', metrics, dpi=150)),
+            'chart': chart_spec('metrics_bar', metrics)
+        }
+    
+    def analyze(self, pdf_file, progress=None, chart_mode='png'):
+        """Everything /upload returns for one PDF.
+
+        progress(stage, **fields) hears about each step as it finishes: 'page'
+        (pages read, financial pages so far, metrics so far), 'summary' and 'chart'.
+        chart_mode is 'png' or 'spec' (see chart_fields).
+        """
+        on_page = None
+        if progress:
+            financial_pages = 0
+            
+            def on_page(pages_read, page_text, metrics_so_far):
+                nonlocal financial_pages
+                if page_text and is_financial(page_text):
+                    financial_pages += 1
+                progress('page', page=pages_read, financial_pages=financial_pages, metrics=metrics_so_far)
+        
+        text, metrics, sources = self.read_report(pdf_file, progress=on_page)
+        with stage('generate_summary'):
+            summary = self.generate_summary(text)
+        if progress:
+            progress('summary', summary=summary, metrics=metrics)
+        with stage('create_chart'):
+            chart = self.chart_fields(metrics, chart_mode)
+        if progress:
+            progress('chart', **chart)
+        
+        return {
+            'summary': summary,
+            'metrics': metrics,
+            'sources': sources,
+            **chart,
+            'status': 'success'
+        }
 
 analyzer = FinancialReportAnalyzer()
 
+def analysis_key(path):
+    """Result cache key for the PDF at path: its hash plus everything else that shapes the analysis"""
+    with stage('hash'):
+        digest = sha256_of(path)
+    return result_key(digest, f'{ANALYSIS_VERSION}.{PAGE_BUDGET or 0}')
+
+def cached_result(key, chart_mode='png'):
+    """The cached analysis for key with its chart in chart_mode, or None"""
+    return with_chart(result_cache().get(key), chart_mode)
+
+def with_chart(result, chart_mode='png'):
+    """A cached analysis (or None) with its chart in chart_mode"""
+    if result is not None and result.get('metrics'):
+        # Cached in whichever mode first asked; the chart may also have been evicted since.
+        # This re-renders a PNG only if so
+        result.pop('chart', None)
+        result.update(analyzer.chart_fields(result['metrics'], chart_mode))
+    return result
+
+def analyze_and_store(path, key, chart_mode='png', progress=None):
+    """Analyze the PDF at path and cache the result under key"""
+    with stage('analyze'):
+        result = analyzer.analyze(path, progress=progress, chart_mode=chart_mode)
+    result_cache().put(key, result)
+    return result
+
+def analyze_cached(path, chart_mode='png'):
+    """analyzer.analyze() through the result cache"""
+    key = analysis_key(path)
+    result = cached_result(key, chart_mode)
+    return result if result is not None else analyze_and_store(path, key, chart_mode)
+
+# /upload has already looked in the cache by the time it queues a job
+# Caps analyses running at once across jobs and batches, so a burst queues (or is refused) instead of
+# every request slowing down and holding its own document text and figure
+admission = AdmissionController()
+jobs = JobQueue(analyze_and_store, workers=app.config['JOB_WORKERS'], max_queued=app.config['JOB_QUEUE_DEPTH'],
+                store=job_store(), admission=admission)
+
+def collect_metrics():
+    """Cache, queue and admission state, read into the registry before it is rendered or snapshotted"""
+    stats = result_cache().stats()
+    registry.set('financial_analyzer_result_cache_hits_total', stats['memory_hits'], tier='memory')
+    registry.set('financial_analyzer_result_cache_hits_total', stats['disk_hits'], tier='disk')
+    registry.set('financial_analyzer_result_cache_misses_total', stats['misses'])
+    registry.set('financial_analyzer_job_queue_depth', jobs.depth())
+    registry.set('financial_analyzer_in_flight', admission.in_flight)
+    registry.set('financial_analyzer_waiting', admission.waiting)
+
+registry.collect(collect_metrics)
+
+def chart_url(key):
+    # Built by hand: jobs run outside any request, where url_for can't build URLs
+    return f'/charts/{key}.png'
+
+def spool_upload(file):
+    """Save an upload to a temporary file the job can read after the request has ended"""
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as spool:
+            file.save(spool)
+    except BaseException:
+        remove_file(path)
+        raise
+    return path
+
+def remove_file(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def requested_chart_mode():
+    """?chart= if it names a mode, else the configured default"""
+    mode = request.args.get('chart')
+    return mode if mode in CHART_MODES else app.config['CHART_MODE']
+
+def result_etag(key, chart_mode):
+    # The same analysis reads differently with a chart spec in it
+    return key if chart_mode == 'png' else f'{key}-{chart_mode}'
+
 @app.route('/')
 def home():
     return render_template('index.html')
 
+def busy_response(message, status, retry_after):
+    response = jsonify({'error': message, 'retry_after': retry_after})
+    response.status_code = status
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def jobs_busy_response():
+    registry.increment('financial_analyzer_rejected_total', status='503')
+    return busy_response('Server busy, please try again shortly', 503, admission.retry_after(jobs.depth()))
+
+@app.errorhandler(Saturated)
+def saturated(e):
+    return busy_response(str(e), e.status, e.retry_after)
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     if 'file' not in request.files:
@@ -108,25 +271,150 @@ def upload_file():
     
     if file and file.filename.lower().endswith('.pdf'):
         try:
-            text = analyzer.extract_text_from_pdf(file)
-            summary = analyzer.generate_summary(text)
-            metrics = analyzer.extract_financial_metrics(text)
-            chart = analyzer.create_chart(metrics)
-            
-            result = {
-                'summary': summary,
-                'metrics': metrics,
-                'chart': chart,
-                'status': 'success'
-            }
-            
-            return jsonify(result)
-            
+            path = spool_upload(file)
+        except Exception as e:
+            return jsonify({'error': f'Processing error: {str(e)}'}), 500
+        chart_mode = requested_chart_mode()
+        try:
+            # The same PDF always analyses the same way, so a repeat upload is answered from the cache
+            key = analysis_key(path)
+            etag = result_etag(key, chart_mode)
+            # The ETag is handed out before the job has run, so it only means "unchanged" once the
+            # result is in the cache
+            result = result_cache().get(key)
+            if result is not None and etag in request.if_none_match:
+                remove_file(path)
+                return result_response(etag, None)
+            result = with_chart(result, chart_mode)
+            if result is not None:
+                remove_file(path)
+                return result_response(etag, result)
+            # Refused only now, so a full queue still answers from the cache; submit() runs the
+            # cleanup itself when the queue is full
+            job_id = jobs.submit(path, key, chart_mode, cleanup=lambda: remove_file(path))
+        except QueueFull:
+            return jobs_busy_response()
         except Exception as e:
+            remove_file(path)
             return jsonify({'error': f'Processing error: {str(e)}'}), 500
+        
+        return jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': url_for('job_status', job_id=job_id),
+            'events_url': url_for('job_events', job_id=job_id),
+            'etag': etag
+        }), 202
     else:
         return jsonify({'error': 'Please upload a PDF file'}), 400
 
+def result_response(etag, result):
+    """A cached analysis in the shape of a finished job, or 304 if the client already has it"""
+    if result is None:
+        response = make_response('', 304)
+    else:
+        response = jsonify({'status': 'done', 'result': result, 'cached': True})
+    response.set_etag(etag)
+    return response
+
+@app.route('/batch', methods=['POST'])
+def upload_batch():
+    """Analyze every PDF in the uploaded files and zip archives.
+
+    Streams one NDJSON line per PDF as each finishes (each carries its file
+    name and index in the batch); with ?format=json, returns them all at the
+    end as one JSON document instead. ?chart=spec as for /upload.
+    """
+    admission.check()
+    files = request.files.getlist('files') + request.files.getlist('file')
+    if not files:
+        return jsonify({'error': 'No files uploaded'}), 400
+    
+    inputs = batch_inputs(files, app.config['MAX_CONTENT_LENGTH'])
+    analyze = functools.partial(analyze_cached, chart_mode=requested_chart_mode())
+    results = run_batch(inputs, analyze, workers=app.config['BATCH_WORKERS'],
+                        admission=admission, admission_timeout=app.config['ADMISSION_TIMEOUT'])
+    
+    if request.args.get('format') == 'json':
+        results = sorted(results, key=lambda result: result['index'])
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'failed': sum(1 for result in results if result.get('status') != 'success')
+        })
+    
+    def ndjson():
+        for result in results:
+            yield json.dumps(result) + '\n'
+    
+    return Response(stream_with_context(ndjson()), mimetype='application/x-ndjson')
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job)
+
+@app.route('/cache/stats')
+def cache_stats():
+    """Result cache hit and miss counts"""
+    return jsonify(result_cache().stats())
+
+@app.route('/metrics')
+def metrics():
+    """Stage latencies, throughput and cache/queue state in Prometheus text format.
+
+    Under serve.py's workers, the totals over every worker (see instrumentation.Registry).
+    """
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-Sent Events stream of a job's progress, ending with a 'done' or 'failed' event.
+
+    Event ids are positions in the job's event log, so a reconnecting client
+    (sending Last-Event-ID) picks up where it left off.
+    """
+    if jobs.get(job_id) is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    try:
+        position = int(request.headers.get('Last-Event-ID', -1)) + 1
+    except ValueError:
+        position = 0
+    heartbeat = app.config['EVENT_HEARTBEAT']
+    
+    def stream():
+        nonlocal position
+        while True:
+            events, finished = jobs.events(job_id, after=position, timeout=heartbeat)
+            if not events and not finished:
+                yield ': keep-alive\n\n'
+            for name, data in events:
+                yield f"id: {position}\nevent: {name}\ndata: {json.dumps(data)}\n\n"
+                position += 1
+            if finished:
+                return
+    
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/charts/<key>.png')
+def chart_image(key):
+    """Cached chart PNG; its key is a hash of what was drawn, so the bytes never change"""
+    # 304 only for a chart this server can still produce - an evicted one has to be asked for again
+    if key in request.if_none_match and chart_exists(key):
+        response = make_response('', 304)
+    else:
+        png = load_chart(key)
+        if png is None:
+            return jsonify({'error': 'Unknown chart'}), 404
+        response = make_response(png)
+        response.headers['Content-Type'] = 'image/png'
+    response.set_etag(key)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
 def find_available_port(start_port=5000, end_port=5010):
     """Find an available port in the range"""
     for port in range(start_port, end_port + 1):
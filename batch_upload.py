@@ -0,0 +1,142 @@
+"""Batch analysis of many PDFs: uploaded files and zip archives in, one result per PDF out"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from admission import Saturated
+
+BATCH_WORKERS = int(os.environ.get('FINANCIAL_ANALYZER_BATCH_WORKERS', 0)) or (os.cpu_count() or 1)
+# Files spooled to disk ahead of the workers, per worker
+BATCH_READAHEAD = 2
+
+
+def _spool(source):
+    """Copy a binary stream to a temporary PDF file and return its path"""
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as spool:
+            shutil.copyfileobj(source, spool)
+    except BaseException:
+        _remove(path)
+        raise
+    return path
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def batch_inputs(files, max_file_size):
+    """Yield (name, path, error) for each PDF in files (werkzeug FileStorage objects).
+
+    Zip archives are opened in place and their PDF members extracted one at a
+    time, as the caller asks for the next input, so only the files currently
+    being worked on are ever on disk. error is set (and path None) for inputs
+    that can't be analysed.
+    """
+    for file in files:
+        name = file.filename or ''
+        if name.lower().endswith('.zip'):
+            try:
+                archive = zipfile.ZipFile(file.stream)
+            except zipfile.BadZipFile:
+                yield name, None, 'Not a valid zip archive'
+                continue
+            with archive:
+                for member in archive.infolist():
+                    if member.is_dir() or not member.filename.lower().endswith('.pdf'):
+                        continue
+                    if member.file_size > max_file_size:
+                        yield member.filename, None, 'File too large'
+                        continue
+                    try:
+                        with archive.open(member) as source:
+                            path = _spool(source)
+                    except (zipfile.BadZipFile, OSError, RuntimeError) as e:
+                        yield member.filename, None, f'Cannot extract file: {str(e)}'
+                        continue
+                    yield member.filename, path, None
+        elif name.lower().endswith('.pdf'):
+            file.stream.seek(0)
+            yield name, _spool(file.stream), None
+        else:
+            yield name, None, 'Please upload PDF files or zip archives'
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def batch_pool():
+    """The thread pool shared by every batch, so concurrent batches share BATCH_WORKERS"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch')
+        return _pool
+
+
+def run_batch(inputs, analyze, workers=BATCH_WORKERS, admission=None, admission_timeout=None):
+    """Yield one result dict per input from batch_inputs(), in completion order.
+
+    analyze(path) runs on the shared batch pool. At most BATCH_READAHEAD files
+    per worker are spooled or in flight at once, so memory and disk use stay
+    bounded however many files the batch holds. Each result carries the file
+    name, its position in the batch, and the seconds it waited and ran.
+
+    With an admission controller, each file takes a slot before it goes to the
+    pool, waiting up to admission_timeout; a file that can't get one comes
+    back as an error with a retry_after.
+    """
+    pool = batch_pool()
+    pending = set()
+
+    def analyze_file(index, name, path, waited):
+        start = time.perf_counter()
+        try:
+            result = analyze(path)
+        except Exception as e:
+            result = {'status': 'error', 'error': f'Processing error: {str(e)}'}
+        finally:
+            _remove(path)
+            run_seconds = time.perf_counter() - start
+            if admission:
+                admission.release(run_seconds)
+        return dict(result, file=name, index=index, wait_seconds=waited, run_seconds=run_seconds)
+
+    for index, (name, path, error) in enumerate(inputs):
+        if error:
+            yield {'file': name, 'index': index, 'status': 'error', 'error': error}
+            continue
+        while len(pending) >= workers * BATCH_READAHEAD:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+        waited = 0.0
+        if admission:
+            try:
+                waited = admission.acquire(admission_timeout, queue='batch')
+            except Saturated as e:
+                _remove(path)
+                yield {'file': name, 'index': index, 'status': 'error', 'error': str(e),
+                       'retry_after': e.retry_after}
+                continue
+        try:
+            pending.add(pool.submit(analyze_file, index, name, path, waited))
+        except RuntimeError:
+            _remove(path)
+            if admission:
+                admission.release()
+            raise
+
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
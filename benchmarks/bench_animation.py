@@ -0,0 +1,155 @@
+"""Benchmark chart animation frame rate and CPU: full redraw per frame vs. blitting.
+
+Builds the AI GUI's create_grow_animation and the enhanced GUI's
+create_smooth_grow_animation on an offscreen Agg canvas the size of a large
+window, then plays --frames frames as fast as possible two ways:
+
+  full   every frame re-renders the whole figure (what FuncAnimation(blit=False) did)
+  blit   the BlitAnimation engine: restore the cached background, draw the moving artists
+
+and reports frames/second and the CPU time per frame, plus the share of one
+core each needs at the GUIs' 20 fps (50 ms interval). Copying the frame to the
+Tk window is left out for both, so no display is needed.
+
+It then times the particle-flow update alone - moving every particle and
+handing the positions to the scatter, without drawing - for --particles
+counts, comparing the per-particle dict loop the GUIs used to run with the
+vectorised ParticleSystem:
+
+    python benchmarks/bench_animation.py --frames 200 --size 14x8 --dpi 100 --particles 1000,10000,50000
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+
+import numpy as np  # noqa: E402
+
+import financial_analyzer_ai  # noqa: E402
+import financial_analyzer_enhanced  # noqa: E402
+from animation_engine import ParticleSystem  # noqa: E402
+
+SAMPLE_METRICS = {'revenue': 12500000.0, 'net_income': 1800000.0, 'assets': 35000000.0,
+                  'profit': 6200000.0, 'ebitda': 3500000.0}
+TARGET_FPS = 20
+
+
+class Speed:
+    """Stands in for the GUIs' speed slider variable"""
+
+    def get(self):
+        return 1.0
+
+
+def ai_grow(fig, ax):
+    gui = financial_analyzer_ai.AIFinancialAnalyzer.__new__(financial_analyzer_ai.AIFinancialAnalyzer)
+    gui.fig, gui.ax, gui.canvas = fig, ax, fig.canvas
+    gui.metrics = dict(SAMPLE_METRICS)
+    gui.file_path = 'FINANCIAL REPORT Q1 2024.pdf'
+    return gui.create_grow_animation('bar')
+
+
+def enhanced_smooth_grow(fig, ax):
+    gui = financial_analyzer_enhanced.FinancialAnalyzerGUI.__new__(financial_analyzer_enhanced.FinancialAnalyzerGUI)
+    gui.fig, gui.ax, gui.canvas = fig, ax, fig.canvas
+    gui.metrics = dict(SAMPLE_METRICS)
+    gui.speed_var = Speed()
+    # The static chart setup_graph() draws first; the animation plays over it
+    names = [name.replace('_', ' ').title() for name in gui.metrics]
+    ax.bar(names, list(gui.metrics.values()), alpha=0.8)
+    ax.set_ylim(0, max(gui.metrics.values()) * 1.2)
+    ax.set_title('FINANCIAL METRICS - BAR CHART', fontsize=14, fontweight='bold', pad=20)
+    ax.grid(True, alpha=0.2, linestyle='--')
+    return gui.create_smooth_grow_animation()
+
+
+ANIMATIONS = {'ai create_grow_animation': ai_grow, 'enhanced create_smooth_grow_animation': enhanced_smooth_grow}
+
+
+def play(build, mode, frames, size, dpi):
+    """Play frames frames; return (frames/second, CPU ms per frame)"""
+    fig = Figure(figsize=size, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    anim = build(fig, ax)
+    fig.canvas.draw()
+    if mode == 'full':
+        # Back to ordinary artists, re-rendered with everything else on every frame
+        anim.stop()
+    wall, cpu = time.perf_counter(), time.process_time()
+    for frame in range(frames):
+        if mode == 'full':
+            anim.func(frame % anim.frames)
+            fig.canvas.draw()
+        else:
+            anim.step()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return frames / wall, cpu / frames * 1000
+
+
+def dict_particles(ax, values, per_bar):
+    """The old particle flow: a dict per particle, moved in a Python loop, offsets rebuilt every frame"""
+    particles = [{'bar_idx': i, 'x': i + np.random.uniform(-0.3, 0.3), 'y': np.random.uniform(0, value),
+                  'speed': np.random.uniform(0.2, 0.6)}
+                 for i, value in enumerate(values) for _ in range(per_bar)]
+    scatter = ax.scatter([p['x'] for p in particles], [p['y'] for p in particles])
+
+    def step():
+        for p in particles:
+            p['y'] += p['speed'] * 0.3
+            if p['y'] > values[p['bar_idx']]:
+                p['y'] = 0
+        scatter.set_offsets(np.array([[p['x'], p['y']] for p in particles]))
+    return step
+
+
+def vector_particles(ax, values, per_bar):
+    particles = ParticleSystem(values, per_bar=per_bar, spread=0.3, speed_range=(0.2 * 0.3, 0.6 * 0.3))
+    particles.attach(ax.scatter(particles.positions[:, 0], particles.positions[:, 1]))
+    return particles.step
+
+
+def time_particles(build, count, frames):
+    """CPU ms per frame to move count particles spread over the sample metrics' bars"""
+    values = list(SAMPLE_METRICS.values())
+    ax = Figure().add_subplot(111)
+    step = build(ax, values, max(count // len(values), 1))
+    cpu = time.process_time()
+    for _ in range(frames):
+        step()
+    return (time.process_time() - cpu) / frames * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--size', default='14x8', help="figure size in inches, WIDTHxHEIGHT")
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--particles', default='1000,10000,50000', help="comma-separated particle counts")
+    args = parser.parse_args()
+    size = tuple(float(part) for part in args.size.split('x'))
+
+    print(f"{args.frames} frames at {size[0] * args.dpi:.0f}x{size[1] * args.dpi:.0f} px")
+    for name, build in ANIMATIONS.items():
+        for mode in ('full', 'blit'):
+            fps, cpu_ms = play(build, mode, args.frames, size, args.dpi)
+            core = min(cpu_ms * TARGET_FPS / 10, 100)
+            print(f"{name:<40} {mode:<5} {fps:7.1f} fps  {cpu_ms:6.2f} ms CPU/frame  "
+                  f"{core:5.1f}% of a core at {TARGET_FPS} fps")
+
+    print(f"\nparticle update, {args.frames} frames")
+    for count in (int(part) for part in args.particles.split(',')):
+        loop_ms = time_particles(dict_particles, count, args.frames)
+        vector_ms = time_particles(vector_particles, count, args.frames)
+        print(f"{count:>7} particles  dict loop {loop_ms:8.3f} ms/frame  ParticleSystem {vector_ms:6.3f} ms/frame  "
+              f"{loop_ms / vector_ms:6.0f}x")
+
+
+if __name__ == '__main__':
+    main()
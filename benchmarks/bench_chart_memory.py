@@ -0,0 +1,141 @@
+"""Benchmark memory across repeated analyses: a new figure per chart vs. one reused figure.
+
+Redraws the enhanced, pro and AI GUIs' charts --analyses times each,
+cycling through their graph types with fresh metrics every time - what a
+long session of analyses and graph-type changes does - two ways:
+
+  rebuild  a new pyplot figure and canvas for every chart, as setup_graph used to
+  reuse    the GUIs' ChartCanvas: one figure, cleared and redrawn in place
+
+and prints the process RSS as it goes, its growth after warm-up, and how
+many figures pyplot is holding at the end. The charts are drawn on an
+offscreen Agg canvas, so no display is needed; the Tk images the old
+canvases also left behind are not counted:
+
+    python benchmarks/bench_chart_memory.py --analyses 200
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import matplotlib  # noqa: E402
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt  # noqa: E402
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+
+import financial_analyzer_ai  # noqa: E402
+import financial_analyzer_enhanced  # noqa: E402
+import financial_analyzer_pro_animations  # noqa: E402
+from chart_canvas import ChartCanvas  # noqa: E402
+
+METRICS = ['revenue', 'net_income', 'assets', 'profit', 'ebitda']
+WARMUP = 20
+
+
+class Value:
+    """Stands in for the GUIs' Tk variables"""
+
+    def __init__(self, value=None):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class Button:
+    """Stands in for the animation buttons setup_graph resets"""
+
+    def config(self, **options):
+        pass
+
+
+class OffscreenChart(ChartCanvas):
+    """ChartCanvas on an Agg canvas instead of a Tk one"""
+
+    def __init__(self, figsize, pyplot=False):
+        if pyplot:
+            # What setup_graph used to do: a figure pyplot keeps until plt.close()
+            self.fig, self.ax = plt.subplots(figsize=figsize)
+        else:
+            self.fig = Figure(figsize=figsize)
+            self.ax = self.fig.add_subplot(111)
+        self.fig.patch.set_facecolor('#1a1a1a')
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.widget = self.toolbar = None
+        self.shown = False
+
+    def show(self, **pack):
+        self.canvas.draw()
+
+
+GUIS = {
+    'enhanced': (financial_analyzer_enhanced.FinancialAnalyzerGUI, (12, 7),
+                 ['bar', 'horizontal', 'line', 'stacked', 'comparison']),
+    'pro': (financial_analyzer_pro_animations.FinancialAnalyzerGUI, (14, 8), ['bar', 'pie', 'horizontal', 'line']),
+    'ai': (financial_analyzer_ai.AIFinancialAnalyzer, (12, 7), ['bar', 'horizontal', 'line', 'stacked', 'comparison']),
+}
+
+
+def make_gui(cls):
+    gui = cls.__new__(cls)
+    gui.chart = None
+    gui.current_animation = None
+    gui.animation_running = False
+    gui.start_btn = gui.stop_btn = Button()
+    gui.graph_var = Value()
+    gui.file_path = 'FINANCIAL REPORT Q1 2024.pdf'
+    return gui
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+def run(mode, analyses, seed=0):
+    """Draw analyses charts per GUI; return [(analyses done, RSS MB)]"""
+    rng = random.Random(seed)
+    guis = [(make_gui(cls), size, types) for cls, size, types in GUIS.values()]
+    samples = []
+    for n in range(1, analyses + 1):
+        for gui, size, types in guis:
+            if mode == 'rebuild' or gui.chart is None:
+                gui.chart = OffscreenChart(size, pyplot=mode == 'rebuild')
+                gui.fig, gui.ax, gui.canvas = gui.chart.fig, gui.chart.ax, gui.chart.canvas
+            gui.metrics = {name: rng.uniform(1e5, 5e7) for name in METRICS}
+            gui.graph_var.set(types[n % len(types)])
+            gui.setup_graph()
+        if n == WARMUP or n % max(analyses // 10, 1) == 0:
+            gc.collect()
+            samples.append((n, rss_mb()))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--analyses', type=int, default=200, help="charts drawn per GUI")
+    args = parser.parse_args()
+
+    print(f"{args.analyses} analyses x {len(GUIS)} GUIs")
+    # reuse first, so the figures the rebuild run piles up are not in its numbers
+    for mode in ('reuse', 'rebuild'):
+        samples = run(mode, args.analyses)
+        warm = dict(samples)[WARMUP]
+        growth = samples[-1][1] - warm
+        print(f"\n{mode}: RSS (MB)  " + "  ".join(f"{n}: {rss:.0f}" for n, rss in samples))
+        print(f"{mode}: {growth:+.1f} MB after warm-up ({growth * 1024 / (args.analyses - WARMUP):+.1f} KB/analysis), "
+              f"{len(plt.get_fignums())} pyplot figures open")
+        plt.close('all')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark chart rendering throughput at several levels of concurrency.
+
+Renders --charts metrics charts from N threads at once, with the pooled
+object-oriented renderer and with the old pyplot code (serialised by a lock,
+since pyplot's global state is not thread-safe), and reports charts/second.
+First it checks that a pooled template, reused across the whole workload,
+renders every chart byte for byte as a fresh template does:
+
+    python benchmarks/bench_chart_renderer.py --threads 1 4 16 --charts 64
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from chart_renderer import ChartRenderer, MetricsBarChart
+
+METRICS = ['revenue', 'net_income', 'assets', 'profit']
+# Longer and shorter labels than METRICS, and no data at all, move the layout the most
+CHECK_METRICS = [{'total_liabilities_and_stockholders_equity': 4.2e9, 'ebitda': 7.5},
+                 {'eps': 1.25}, {}]
+_pyplot_lock = threading.Lock()
+
+
+def random_metrics(rng):
+    return {name: rng.uniform(1e3, 1e9) for name in METRICS[:rng.randint(1, len(METRICS))]}
+
+
+def pyplot_chart(metrics):
+    """The chart as app.create_chart drew it before the renderer existed"""
+    with _pyplot_lock:
+        fig, ax = plt.subplots(figsize=(10, 6))
+        names = [name.replace('_', ' ').title() for name in metrics.keys()]
+        bars = ax.bar(names, list(metrics.values()), color=['#3498db', '#2ecc71', '#e74c3c'])
+        ax.set_title('Financial Metrics', fontweight='bold')
+        ax.set_ylabel('Amount ($)')
+        for bar in bars:
+            height = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width()/2., height,
+                    f'${height:,.0f}', ha='center', va='bottom', fontweight='bold')
+        plt.xticks(rotation=45)
+        plt.tight_layout()
+        buf = io.BytesIO()
+        plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
+        plt.close()
+        return buf.getvalue()
+
+
+def check_pooled(workload):
+    """Render workload on one reused template and on a fresh one per chart; return the mismatches"""
+    pooled = MetricsBarChart()
+    return sum(pooled.render(metrics) != MetricsBarChart().render(metrics) for metrics in workload)
+
+
+def throughput(render, workload, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for png in pool.map(render, workload):
+            assert png.startswith(b'\x89PNG')
+    return len(workload) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--charts', type=int, default=64)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    workload = [random_metrics(rng) for _ in range(args.charts)]
+
+    check = [metrics for pair in zip(workload[:len(CHECK_METRICS) * 3], CHECK_METRICS * 3) for metrics in pair]
+    mismatches = check_pooled(check)
+    print(f"pooled vs fresh template: {len(check) - mismatches}/{len(check)} charts identical")
+    if mismatches:
+        sys.exit(1)
+
+    for threads in args.threads:
+        renderer = ChartRenderer(pool_size=threads)
+        renderer.render('metrics_bar', workload[0])  # warm fonts and one template
+        pooled = throughput(lambda metrics: renderer.render('metrics_bar', metrics), workload, threads)
+        baseline = throughput(pyplot_chart, workload, threads)
+        print(f"threads={threads:<3} pooled {pooled:7.1f} charts/s   pyplot {baseline:7.1f} charts/s   "
+              f"x{pooled / baseline:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Micro-benchmark document_classifier against the original financial-page heuristic.
+
+Scores a synthetic report with the original heuristic (44 substring scans plus
+six regex passes per page) and with score_pages(), checking that every score
+is identical:
+
+    python benchmarks/bench_document_classifier.py --pages 1000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from document_classifier import CURRENCY_PATTERNS, FINANCIAL_KEYWORDS, STATEMENT_INDICATORS, score_pages
+
+FILLER = ("The Group continued to invest in its core markets during the year, and the Board "
+          "remains confident in the strategy set out in last year's report. ").split()
+
+
+def per_page_score(text):
+    """The heuristic as AIFinancialAnalyzer.is_financial_document used to compute it"""
+    text_lower = text.lower()
+    financial_score = 0
+    for keyword in FINANCIAL_KEYWORDS:
+        if keyword in text_lower:
+            financial_score += 2
+    for pattern in CURRENCY_PATTERNS:
+        matches = re.findall(pattern, text_lower)
+        if matches:
+            financial_score += len(matches) * 3
+    for indicator in STATEMENT_INDICATORS:
+        if re.search(indicator, text_lower):
+            financial_score += 5
+    return financial_score
+
+
+def build_pages(count, words_per_page, seed):
+    rng = random.Random(seed)
+    vocabulary = FILLER * 8 + FINANCIAL_KEYWORDS + ['$1,250', '3.4 million', 'Balance Sheet', '12,500']
+    return [' '.join(rng.choice(vocabulary) for _ in range(words_per_page)) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=1000)
+    parser.add_argument('--words', type=int, default=500, help="words per page")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    pages = build_pages(args.pages, args.words, args.seed)
+    expected = [per_page_score(page) for page in pages]
+    if score_pages(pages) != expected:
+        raise AssertionError("batch scores differ from the per-page heuristic")
+    print(f"{args.pages} pages, {sum(map(len, pages)) / 1024:,.0f} KB: scores identical")
+
+    timings = {}
+    for name, func in [('original', lambda: [per_page_score(page) for page in pages]),
+                       ('score_pages', lambda: score_pages(pages))]:
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+        print(f"{name:<12} {best * 1000:9.1f} ms  {best * 1e6 / args.pages:8.1f} us/page")
+    print(f"speedup x{timings['original'] / timings['score_pages']:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""Fuzz and time the anchored metric scanner against the regexes it replaces.
+
+Checks that every AnchoredScanner in the registry finds exactly what its
+label.*?figure regexes find on random documents, and that the AI profile's
+combined patterns find what trying each of them in turn finds, and that
+every profile's StreamingMetricExtractor, fed a document page by page, finds
+what one pass over the whole text finds. Then times
+the scanners, the regexes they replace and the AI profile on adversarial
+inputs (labels with no figure in reach, long blank runs, repeated partial
+labels) of doubling size and on a synthetic 1000-page report. Scanner and AI
+profile time should grow linearly with the input:
+
+    python benchmarks/bench_metric_scanner.py --fuzz 2000 --sizes 10000 20000 40000 80000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metric_patterns import FIGURE, LABELLED_FIGURE, METRIC_PATTERNS, MetricPattern
+from metric_scanner import AnchoredScanner
+from report_stream import StreamingMetricExtractor, parse_figure
+
+FUZZ_TOKENS = ['revenue', 'sales', 'total revenue', 'net income', 'net profit', 'net earnings',
+               'total assets', 'assets', 'profit', 'gross profit', 'ebitda', 'expenses',
+               'liabilities', 'equity', 'REVENUE', '1,234', '12.50', '7', '2024', '$', ' $ ',
+               ':', '\n', '\n\n', ' ', '\t', '\r', ' ', '٣', 'x' * 50,
+               'property, plant and equipment', 'property', 'equipment', 'earnings before interest',
+               'tax, depreciation and amortization', 'taxes', 'income from operations', 'debt',
+               "shareholders' equity", 'total liabilities', 'million', ': $', ' : ', '12,500,000']
+# The AI profile's label-to-figure gap before it was rewritten; it must accept the same text
+OLD_LABELLED_FIGURE = r'\s*:?\s*[\$]?\s*' + FIGURE
+
+# Label and figure on either side of a page break, the label further back than any fixed overlap
+STREAM_CASES = [
+    ['liabilities' + ' filler' * 40 + ' total assets\n', '12.50 more text\n'],
+    ['revenue for the year' + ' ' * 300 + '\n\n', '\n1,234\n'],
+    ['gross profit\n$\n', ':\n', '99\n'],
+]
+
+PAGE = """Consolidated Statement of Profit or Loss for the year ended 31 December 2024
+The Group's revenue increased as a result of higher sales volumes across all regions.
+Revenue                                   $ 1,234,567.00     $ 1,100,250.00
+Cost of sales                                (734,120.00)       (690,400.00)
+Gross profit                                 500,447.00         409,850.00
+Net income attributable to shareholders      210,330.00         180,120.00
+Total assets                               4,120,000.00       3,980,500.00
+"""
+
+
+def scanners():
+    for profile, table in METRIC_PATTERNS.items():
+        for metric, pattern in table.items():
+            if isinstance(pattern, AnchoredScanner):
+                yield f"{profile}.{metric}", pattern, MetricPattern(pattern.patterns)
+
+
+def in_priority_order(pattern, text, parse):
+    """What MetricPattern.search promises: the first pattern, by priority, whose first match parses"""
+    for priority, regex in enumerate(pattern.compiled):
+        match = regex.search(text)
+        if match:
+            value = parse(match.group(1))
+            if value is not None:
+                return priority, value, match.span(1)
+    return None
+
+
+def fuzz(rounds, seed):
+    rng = random.Random(seed)
+    checked = 0
+    old_gap = re.compile('revenue' + OLD_LABELLED_FIGURE)
+    new_gap = re.compile('revenue' + LABELLED_FIGURE)
+    for _ in range(rounds):
+        text = ''.join(rng.choice(FUZZ_TOKENS) + rng.choice(['', ' ', '\n'])
+                       for _ in range(rng.randint(0, 80)))
+        for name, scanner, regex in scanners():
+            expected = regex.search(text, parse_figure)
+            actual = scanner.search(text, parse_figure)
+            if expected != actual:
+                raise AssertionError(f"{name} disagrees on {text!r}: {expected} != {actual}")
+            checked += 1
+        # The AI analyzer matches its case-sensitive patterns against lowercased text
+        lowered = text.lower()
+        for metric, pattern in METRIC_PATTERNS['ai'].items():
+            expected = in_priority_order(pattern, lowered, parse_figure)
+            actual = pattern.search(lowered, parse_figure)
+            if expected != actual:
+                raise AssertionError(f"ai.{metric} disagrees on {lowered!r}: {expected} != {actual}")
+            checked += 1
+        for match in old_gap.finditer(lowered):
+            if new_gap.match(lowered, match.start()).span(1) != match.span(1):
+                raise AssertionError(f"LABELLED_FIGURE disagrees on {lowered!r}")
+    print(f"Fuzz: {checked:,} scans agree")
+
+
+def streamed(profile, pages):
+    """(metrics, figure spans) from feeding pages one at a time, and from one pass over them all"""
+    results = []
+    for chunks in (pages, [''.join(pages)]):
+        extractor = StreamingMetricExtractor(METRIC_PATTERNS[profile], lowercase=profile == 'ai')
+        for page, chunk in enumerate(chunks, 1):
+            extractor.feed(chunk, page=page)
+        spans = {metric: (source['start'], source['end']) for metric, source in extractor.sources().items()}
+        results.append((extractor.metrics(), spans))
+    return results
+
+
+def stream_fuzz(rounds, seed):
+    rng = random.Random(seed)
+    documents = list(STREAM_CASES)
+    for _ in range(rounds):
+        # Each page ends in a line break, as read_pages() feeds them
+        documents.append([''.join(rng.choice(FUZZ_TOKENS) + rng.choice(['', ' ', '\n'])
+                                  for _ in range(rng.randint(0, 30))) + '\n'
+                          for _ in range(rng.randint(1, 6))])
+    checked = 0
+    for pages in documents:
+        for profile in METRIC_PATTERNS:
+            streaming, one_shot = streamed(profile, pages)
+            if streaming != one_shot:
+                raise AssertionError(f"{profile} streaming disagrees on {pages!r}: {streaming} != {one_shot}")
+            checked += 1
+    print(f"Streaming: {checked:,} documents agree with one-pass extraction")
+
+
+def adversarial(size):
+    """Labels with no figure in reach: one long line, labels followed by wide gaps or long blank
+    runs, and a multi-word label repeated without its last word"""
+    return {
+        'one line': ('revenue sales net income profit assets ' * (size // 40 + 1))[:size] + '\n1',
+        'wide gaps': (('profit' + ' x' * 120 + '\n') * (size // 247 + 1))[:size] + '1',
+        'blank runs': (('revenue total assets ebitda' + ' ' * 2000 + '\n') * (size // 2028 + 1))[:size] + '1',
+        'long label': ('earnings before interest tax depreciation ' * (size // 42 + 1))[:size] + '\n1',
+    }
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def scan_all(patterns, text):
+    for pattern in patterns:
+        pattern.search(text, parse_figure)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fuzz', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 20000, 40000, 80000])
+    parser.add_argument('--pages', type=int, default=1000)
+    parser.add_argument('--regex-timeout', type=float, default=30.0,
+                        help="skip the regexes on larger inputs once a run takes longer than this")
+    args = parser.parse_args()
+
+    fuzz(args.fuzz, args.seed)
+    stream_fuzz(args.fuzz, args.seed)
+
+    compared = list(scanners())
+    anchored = [scanner for _, scanner, _ in compared]
+    regexes = [regex for _, _, regex in compared]
+    ai = list(METRIC_PATTERNS['ai'].values())
+    skip_regex = set()
+    for size in sorted(args.sizes):
+        for case, text in adversarial(size).items():
+            scan_time = _timed(scan_all, anchored, text)
+            ai_time = _timed(scan_all, ai, text.lower())
+            if case in skip_regex:
+                regex_line = "skipped"
+            else:
+                regex_time = _timed(scan_all, regexes, text)
+                regex_line = f"{regex_time:8.3f}s"
+                if regex_time > args.regex_timeout:
+                    skip_regex.add(case)
+            print(f"{case:<10} {size:>9,} chars  scanner {scan_time:8.3f}s  ai {ai_time:8.3f}s  regex {regex_line}")
+
+    report = PAGE * args.pages
+    scan_time = _timed(scan_all, anchored, report)
+    ai_time = _timed(scan_all, ai, report.lower())
+    regex_time = _timed(scan_all, regexes, report)
+    print(f"{args.pages}-page report ({len(report) / 1024:,.0f} KB): "
+          f"scanner {scan_time:.3f}s  ai {ai_time:.3f}s  regex {regex_time:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark serial vs. process-pool PDF text extraction.
+
+Replicates the bundled annual report until it reaches --pages pages and times
+extract_pages() with each worker count. The page cache is bypassed, so
+every run parses the document:
+
+    python benchmarks/bench_pdf_extraction.py --pages 300 --workers 1 2 4 8
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import PyPDF2
+
+from pdf_extraction import extract_pages
+
+SOURCE_PDF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'ANNUAL FINANCIAL REPORT 2024.pdf')
+
+
+def build_document(source, target_pages):
+    """Return the bytes of a PDF made by repeating source's pages"""
+    reader = PyPDF2.PdfReader(source)
+    writer = PyPDF2.PdfWriter()
+    while len(writer.pages) < target_pages:
+        for page in reader.pages:
+            if len(writer.pages) >= target_pages:
+                break
+            writer.add_page(page)
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--source', default=SOURCE_PDF)
+    args = parser.parse_args()
+
+    data = build_document(args.source, args.pages)
+    print(f"Document: {args.pages} pages, {len(data) / 1024:,.0f} KB")
+
+    baseline = None
+    for workers in sorted(set(args.workers)):
+        extract_pages(data, workers=workers, cache=False)  # warm the pool
+        best = min(_timed(extract_pages, data, workers) for _ in range(args.repeat))
+        baseline = baseline or best
+        print(f"workers={workers:<3} {best:7.2f}s  {args.pages / best:8.1f} pages/s  "
+              f"speedup x{baseline / best:.2f}")
+
+
+def _timed(func, data, workers):
+    start = time.perf_counter()
+    func(data, workers=workers, cache=False)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark requests/second from the development server vs. serve.py.
+
+Starts each server on a local port with the result, page and chart caches
+out of the way, then has --clients client processes send requests for
+--seconds and reports requests/second for a cheap JSON endpoint
+(/cache/stats) and a full synchronous analysis (/batch?format=json with the
+bundled Q1 report):
+
+    python benchmarks/bench_serving.py --workers 4 --clients 8 --seconds 10
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_PDF = os.path.join(ROOT, 'FINANCIAL REPORT Q1 2024.pdf')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode, port, workers, scratch, env_overrides=None):
+    """Start `python app.py`-style ('dev') or serve.py ('prefork') on port; caches off unless overridden"""
+    env = dict(os.environ,
+               FINANCIAL_ANALYZER_CACHE_DIR='',
+               FINANCIAL_ANALYZER_RESULT_DB='',
+               FINANCIAL_ANALYZER_RESULT_CACHE_ENTRIES='0',
+               FINANCIAL_ANALYZER_CHART_DIR=os.path.join(scratch, 'charts'),
+               FINANCIAL_ANALYZER_JOB_DB=os.path.join(scratch, 'jobs.sqlite3'))
+    env.update(env_overrides or {})
+    if mode == 'dev':
+        # What `python app.py` runs, minus the reloader's extra process
+        command = [sys.executable, '-c',
+                   f"import app; app.app.run(debug=True, use_reloader=False, host='127.0.0.1', port={port}, threaded=True)"]
+    else:
+        command = [sys.executable, 'serve.py', '--bind', f'127.0.0.1:{port}', '--workers', str(workers)]
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/cache/stats', timeout=1).read()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+def multipart(path):
+    boundary = uuid.uuid4().hex
+    with open(path, 'rb') as f:
+        data = f.read()
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="files"; filename="report.pdf"\r\n'
+            f'Content-Type: application/pdf\r\n\r\n').encode() + data + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def client(url, body, content_type, seconds):
+    """Send requests back to back for seconds; return how many succeeded"""
+    done = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        request = urllib.request.Request(url, data=body, headers={'Content-Type': content_type} if body else {})
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            done += response.status == 200
+    return done
+
+
+def requests_per_second(url, clients, seconds, body=None, content_type=None):
+    with ProcessPoolExecutor(max_workers=clients) as pool:
+        futures = [pool.submit(client, url, body, content_type, seconds) for _ in range(clients)]
+        return sum(future.result() for future in futures) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--source', default=SAMPLE_PDF)
+    args = parser.parse_args()
+
+    body, content_type = multipart(args.source)
+    print(f"{args.clients} clients, {args.seconds:g}s per endpoint, serve.py with {args.workers} workers")
+    for mode in ('dev', 'prefork'):
+        port = free_port()
+        with tempfile.TemporaryDirectory() as scratch:
+            server = start_server(mode, port, args.workers, scratch)
+            try:
+                base = f'http://127.0.0.1:{port}'
+                light = requests_per_second(f'{base}/cache/stats', args.clients, args.seconds)
+                analyze = requests_per_second(f'{base}/batch?format=json', args.clients, args.seconds,
+                                              body, content_type)
+            finally:
+                server.terminate()
+                server.wait()
+        print(f"{mode:<8} /cache/stats {light:8.1f} req/s   /batch (1 PDF) {analyze:7.1f} req/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Check each entry point's cold import time against a budget.
+
+Imports every entry point in a fresh interpreter under `python -X importtime`,
+several times, and reports the best cumulative import time. Fails (exit
+status 1) if an entry point goes over its budget or loads one of the heavy
+dependencies that should wait until first use:
+
+    python benchmarks/bench_startup.py --repeat 5
+    python benchmarks/bench_startup.py --scale 2   # budgets x2, for a slow machine
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Milliseconds to import each entry point; the GUIs only need tkinter before their window shows
+BUDGETS_MS = {
+    'simple_analyzer': 250,
+    'financial_analyzer_gui': 300,
+    'financial_analyzer_enhanced': 300,
+    'financial_analyzer_pro_animations': 300,
+    'financial_analyzer_ai': 300,
+    'app': 600,
+}
+HEAVY_MODULES = ('matplotlib', 'numpy', 'pandas', 'sklearn', 'PyPDF2')
+
+
+def import_time_ms(module):
+    """Cumulative import time of module in a fresh interpreter, from -X importtime"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    for line in reversed(result.stderr.splitlines()):
+        parts = [part.strip() for part in line.split('|')]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"no import time reported for {module}")
+
+
+def heavy_imports(module):
+    """Which of HEAVY_MODULES importing module loads"""
+    check = f"import sys, {module}; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', check], cwd=ROOT, capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scale', type=float, default=1.0, help="multiply every budget by this")
+    parser.add_argument('modules', nargs='*', default=list(BUDGETS_MS))
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        budget = BUDGETS_MS.get(module, 300) * args.scale
+        best = min(import_time_ms(module) for _ in range(args.repeat))
+        heavy = heavy_imports(module)
+        ok = best <= budget and not heavy
+        failed |= not ok
+        note = f"  loads {', '.join(heavy)} at import" if heavy else ""
+        print(f"{'ok  ' if ok else 'FAIL'} {module:<36} {best:7.1f} ms  (budget {budget:.0f} ms){note}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
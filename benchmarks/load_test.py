@@ -0,0 +1,321 @@
+"""Load-test /upload with the bundled reports and synthetic PDFs.
+
+Starts the web app locally (or targets --url) and uploads a mix of the three
+bundled PDFs and freshly generated synthetic reports - each with its own
+random figures, so it misses the result cache - either from a fixed number of
+concurrent clients or at a target arrival rate. Every upload is followed over
+its job's event stream until the analysis is done, so latency is end to end.
+Reports p50/p95/p99 latency, throughput, errors by kind, and the server's RSS
+(the whole process tree) over time:
+
+    python benchmarks/load_test.py --concurrency 8 --duration 30
+    python benchmarks/load_test.py --rps 5 --duration 60 --mix bundled=1,synthetic=3 --server prefork
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --server-pid 1234 --rps 2
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_serving import free_port, start_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUNDLED_PDFS = ['ANNUAL FINANCIAL REPORT 2024.pdf', 'FINANCIAL REPORT Q1 2024.pdf', 'basic annual report.pdf']
+JOB_TIMEOUT = 300
+
+SENTENCES = [
+    "The company delivered steady growth across its core business segments during the period.",
+    "Operating efficiency improved as the cost reduction programme was completed on schedule.",
+    "Management expects continued investment in technology and new markets next year.",
+    "Cash generated from operations funded capital expenditure and the annual dividend.",
+    "The board remains confident in the long term strategy and the strength of the balance sheet.",
+]
+
+
+def synthetic_pdf(rng, pages=3):
+    """Bytes of a small text PDF with randomised headline figures"""
+    def escape(text):
+        return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+    contents = []
+    for page in range(pages):
+        lines = [f"ANNUAL FINANCIAL REPORT {rng.randint(2015, 2025)} - page {page + 1}"]
+        if page == 0:
+            lines += [f"Total Revenue: ${rng.randint(1, 900) * 100000:,}",
+                      f"Net Income: ${rng.randint(1, 90) * 100000:,}",
+                      f"Total Assets: ${rng.randint(1, 2000) * 100000:,}",
+                      f"Operating Profit: ${rng.randint(1, 200) * 100000:,}"]
+        lines += rng.sample(SENTENCES, 3)
+        text = ''.join(f"({escape(line)}) Tj T* " for line in lines)
+        contents.append(f"BT /F1 11 Tf 14 TL 50 760 Td {text}ET".encode('latin-1'))
+
+    # 1 catalog, 2 page tree, 3 font, then a page object and its content stream per page
+    page_ids = [4 + 2 * i for i in range(pages)]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {pages} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for page_id, content in zip(page_ids, contents):
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode())
+        objects.append(f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def parse_mix(text):
+    """'bundled=1,synthetic=3' -> {'bundled': 1.0, 'synthetic': 3.0}"""
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        if kind not in ('bundled', 'synthetic'):
+            raise argparse.ArgumentTypeError(f"unknown document kind: {kind}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+class Workload:
+    """Picks the next document to upload according to the mix"""
+
+    def __init__(self, mix, seed):
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.bundled = []
+        for name in BUNDLED_PDFS:
+            with open(os.path.join(ROOT, name), 'rb') as f:
+                self.bundled.append((name, f.read()))
+
+    def next(self):
+        with self.lock:
+            kind = self.rng.choices(self.kinds, self.weights)[0]
+            if kind == 'bundled':
+                name, data = self.rng.choice(self.bundled)
+            else:
+                name, data = f'synthetic-{uuid.uuid4().hex[:8]}.pdf', synthetic_pdf(self.rng, self.rng.randint(1, 6))
+        return kind, name, data
+
+
+def upload(base_url, name, data):
+    """POST one PDF to /upload; returns (HTTP status, parsed JSON body or None)"""
+    boundary = uuid.uuid4().hex
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{name}"\r\n'
+            f'Content-Type: application/pdf\r\n\r\n').encode() + data + f'\r\n--{boundary}--\r\n'.encode()
+    request = urllib.request.Request(f'{base_url}/upload', data=body,
+                                     headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+    try:
+        with urllib.request.urlopen(request, timeout=JOB_TIMEOUT) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, None
+
+
+def follow_job(base_url, events_url):
+    """Read the job's event stream until it finishes; returns 'done' or 'failed'"""
+    with urllib.request.urlopen(f'{base_url}{events_url}', timeout=JOB_TIMEOUT) as stream:
+        for raw in stream:
+            line = raw.decode('utf-8').strip()
+            if line in ('event: done', 'event: failed'):
+                return line.split(': ')[1]
+    return 'failed'
+
+
+def run_request(base_url, workload, scheduled):
+    """One upload, followed to completion; latencies count from when it was scheduled to start"""
+    kind, name, data = workload.next()
+    record = {'kind': kind, 'file': name, 'bytes': len(data), 'scheduled': scheduled}
+    try:
+        status, body = upload(base_url, name, data)
+        record['accept_latency'] = time.perf_counter() - scheduled
+        if status == 202:
+            record['outcome'] = follow_job(base_url, body['events_url'])
+        elif status == 200:
+            record['outcome'] = 'done'  # answered from the result cache
+        else:
+            record['outcome'] = f'http {status}'
+    except (OSError, ValueError) as e:
+        record['outcome'] = f'error {type(e).__name__}'
+    record['latency'] = time.perf_counter() - scheduled
+    return record
+
+
+def process_tree_rss(pid):
+    """Resident memory in bytes of pid and all its descendants (Linux /proc)"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; fields resume after its closing parenthesis
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f'/proc/{current}/statm') as f:
+                total += int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            pass
+        stack.extend(children.get(current, []))
+    return total
+
+
+def sample_rss(pid, interval, stop, samples, start):
+    while not stop.wait(interval):
+        samples.append((time.perf_counter() - start, process_tree_rss(pid)))
+
+
+def closed_loop(base_url, workload, concurrency, duration):
+    """concurrency clients, each uploading again as soon as its last upload finished"""
+    records = []
+    deadline = time.perf_counter() + duration
+
+    def client():
+        while time.perf_counter() < deadline:
+            records.append(run_request(base_url, workload, time.perf_counter()))
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return records
+
+
+def open_loop(base_url, workload, rps, duration, max_clients):
+    """Start uploads on a fixed schedule, however long earlier ones take.
+
+    Latency is measured from each upload's scheduled start, so time spent
+    waiting for a free client counts too.
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_clients) as pool:
+        futures = []
+        for i in range(int(rps * duration)):
+            scheduled = start + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(run_request, base_url, workload, scheduled))
+        return [future.result() for future in futures]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of values"""
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+
+def report(records, elapsed, rss_samples):
+    done = [r for r in records if r['outcome'] == 'done']
+    errors = len(records) - len(done)
+    print(f"\n{len(records)} uploads in {elapsed:.1f}s: {len(done) / elapsed:.2f} completed/s, "
+          f"{len(records) / elapsed:.2f} offered/s")
+    print(f"errors: {errors} ({100 * errors / max(1, len(records)):.1f}%)", end='')
+    outcomes = {}
+    for r in records:
+        if r['outcome'] != 'done':
+            outcomes[r['outcome']] = outcomes.get(r['outcome'], 0) + 1
+    print(''.join(f"  {outcome} x{count}" for outcome, count in sorted(outcomes.items())))
+
+    print(f"\n{'latency (s)':<24}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    rows = [('accepted (upload)', [r['accept_latency'] for r in records if 'accept_latency' in r]),
+            ('completed (all)', [r['latency'] for r in done])]
+    for kind in sorted({r['kind'] for r in done}):
+        rows.append((f'completed ({kind})', [r['latency'] for r in done if r['kind'] == kind]))
+    for label, values in rows:
+        if values:
+            print(f"{label:<24}{len(values):>6}" + ''.join(f"{percentile(values, p):9.3f}" for p in (50, 95, 99))
+                  + f"{max(values):9.3f}")
+
+    if rss_samples:
+        shown = rss_samples[::max(1, len(rss_samples) // 20)]
+        print("\nserver RSS (MB):  " + "  ".join(f"{t:.0f}s {rss / 2**20:.0f}" for t, rss in shown))
+        print(f"peak {max(rss for _, rss in rss_samples) / 2**20:.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument('--concurrency', type=int, default=4, help="clients uploading back to back")
+    load.add_argument('--rps', type=float, help="uploads started per second, regardless of how long they take")
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('bundled=1,synthetic=1'),
+                        help="relative weights of bundled and synthetic PDFs (default bundled=1,synthetic=1)")
+    parser.add_argument('--max-clients', type=int, default=64, help="open loop: most uploads in flight at once")
+    parser.add_argument('--server', choices=('dev', 'prefork'), default='dev')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="prefork server workers")
+    parser.add_argument('--cache', action='store_true', help="keep the server's result and page caches on")
+    parser.add_argument('--url', help="load an already running server instead of starting one")
+    parser.add_argument('--server-pid', type=int, help="with --url: the process to sample RSS from")
+    parser.add_argument('--rss-interval', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="also write every request's record to this file")
+    args = parser.parse_args()
+
+    workload = Workload(args.mix, args.seed)
+    with tempfile.TemporaryDirectory() as scratch:
+        server = None
+        if args.url:
+            base_url, pid = args.url.rstrip('/'), args.server_pid
+        else:
+            port = free_port()
+            overrides = {'FINANCIAL_ANALYZER_RESULT_DB': os.path.join(scratch, 'results.sqlite3'),
+                         'FINANCIAL_ANALYZER_RESULT_CACHE_ENTRIES': '256',
+                         'FINANCIAL_ANALYZER_CACHE_DIR': os.path.join(scratch, 'pages')} if args.cache else {}
+            server = start_server(args.server, port, args.workers, scratch, overrides)
+            base_url, pid = f'http://127.0.0.1:{port}', server.pid
+
+        rss_samples = []
+        stop = threading.Event()
+        start = time.perf_counter()
+        if pid:
+            rss_samples.append((0.0, process_tree_rss(pid)))
+            threading.Thread(target=sample_rss, args=(pid, args.rss_interval, stop, rss_samples, start),
+                             daemon=True).start()
+        mode = f"{args.rps:g} uploads/s" if args.rps else f"{args.concurrency} concurrent clients"
+        print(f"{base_url}: {mode} for {args.duration:g}s, mix {args.mix}")
+        try:
+            if args.rps:
+                records = open_loop(base_url, workload, args.rps, args.duration, args.max_clients)
+            else:
+                records = closed_loop(base_url, workload, args.concurrency, args.duration)
+        finally:
+            stop.set()
+            if server:
+                server.terminate()
+                server.wait()
+        report(records, time.perf_counter() - start, rss_samples)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([dict(r, scheduled=r['scheduled'] - start) for r in records], f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""One long-lived matplotlib figure and Tk canvas per window, cleared and redrawn for every chart"""
+from lazy_import import lazy_import
+
+backend_tkagg = lazy_import('matplotlib.backends.backend_tkagg')
+figure = lazy_import('matplotlib.figure')
+
+
+class ChartCanvas:
+    """A Figure, its Axes and a FigureCanvasTkAgg made once and reused for every chart.
+
+    Building a new figure and canvas for each analysis or graph-type change
+    leaks: plt.subplots() registers every figure with pyplot, which holds on
+    to it - render buffers and all - until plt.close(), and the destroyed
+    canvases' Tk images went with them. This figure is a plain Figure that
+    pyplot never sees. clear() empties the axes for the next chart, and
+    show() draws it into the same widget, packing it the first time.
+    """
+
+    def __init__(self, parent, figsize, facecolor='#1a1a1a', dpi=None, toolbar=False):
+        self.fig = figure.Figure(figsize=figsize, dpi=dpi)
+        self.fig.patch.set_facecolor(facecolor)
+        self.ax = self.fig.add_subplot(111)
+        self.canvas = backend_tkagg.FigureCanvasTkAgg(self.fig, parent)
+        self.widget = self.canvas.get_tk_widget()
+        self.toolbar = None
+        if toolbar:
+            self.toolbar = backend_tkagg.NavigationToolbar2Tk(self.canvas, parent, pack_toolbar=False)
+        self.shown = False
+
+    def clear(self):
+        """Empty the axes - artists, title, limits, styling - and return them for the next chart"""
+        self.ax.clear()
+        # clear() keeps the equal aspect a pie chart sets, which would squash the next bar chart
+        self.ax.set_aspect('auto')
+        return self.ax
+
+    def show(self, **pack):
+        """Draw the chart, packing the canvas (and toolbar) if it isn't on screen"""
+        if not self.shown:
+            if self.toolbar:
+                self.toolbar.pack(side='bottom', fill='x')
+            self.widget.pack(**(pack or {'fill': 'both', 'expand': True}))
+            self.shown = True
+        self.canvas.draw()
+        if self.toolbar:
+            # Home/back/forward refer to the previous chart's views otherwise
+            self.toolbar.update()
+
+    def hide(self):
+        """Take the canvas off screen, keeping it for the next show()"""
+        self.widget.pack_forget()
+        if self.toolbar:
+            self.toolbar.pack_forget()
+        self.shown = False
+
+    def owns(self, widget):
+        """True for the canvas and toolbar widgets, which clearing a frame should leave alone"""
+        return widget is self.widget or widget is self.toolbar
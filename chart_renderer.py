@@ -0,0 +1,252 @@
+"""Thread-safe chart rendering on matplotlib's object-oriented API, with pooled figures.
+
+pyplot keeps one global figure manager, which concurrent requests corrupt.
+Each chart here is drawn on its own Figure/FigureCanvasAgg, checked out of a
+per-type pool: a template figure built once and reset - axes cleared, layout
+restored - before each chart, so a pooled figure renders exactly the PNG a
+fresh one would.
+"""
+import functools
+import hashlib
+import io
+import json
+import os
+import queue
+import threading
+
+from disk_cache import DiskCache
+from lazy_import import lazy_import
+
+# matplotlib loads with the first chart, not with the web app
+matplotlib = lazy_import('matplotlib')
+backend_agg = lazy_import('matplotlib.backends.backend_agg')
+mpl_figure = lazy_import('matplotlib.figure')
+# Slow to import, and only needed once a chart is named
+metadata = lazy_import('importlib.metadata')
+
+# Idle figures kept per chart type (FINANCIAL_ANALYZER_CHART_POOL)
+CHART_POOL_SIZE = int(os.environ.get('FINANCIAL_ANALYZER_CHART_POOL', 4))
+
+# Rendered PNGs, keyed by a hash of what was drawn (FINANCIAL_ANALYZER_CHART_DIR / _CHART_CACHE_MB)
+CHART_CACHE_DIR = os.environ.get('FINANCIAL_ANALYZER_CHART_DIR',
+                                 os.path.join(os.path.expanduser('~'), '.cache', 'financial_analyzer', 'charts'))
+CHART_CACHE_MAX_BYTES = int(os.environ.get('FINANCIAL_ANALYZER_CHART_CACHE_MB', 64)) * 1024 * 1024
+CHART_SUFFIX = '.png'
+# What to draw for charts named but not yet rendered (see deferred_chart), kept alongside the PNGs
+CHART_REQUEST_SUFFIX = '.chart.json'
+
+# Bumped when the shape of chart_spec() output changes
+SPEC_VERSION = 1
+
+BAR_COLORS = ['#3498db', '#2ecc71', '#e74c3c']
+
+
+class ChartTemplate:
+    """A figure for one chart type; setup() and draw() run for each chart, on cleared axes.
+
+    spec() describes the same chart declaratively, for clients that draw it themselves.
+    """
+
+    figsize = (10, 6)
+
+    def __init__(self):
+        self.figure = mpl_figure.Figure(figsize=self.figsize, layout='tight')
+        self.canvas = backend_agg.FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot()
+        params = self.figure.subplotpars
+        self._subplot_params = {name: getattr(params, name)
+                                for name in ('left', 'bottom', 'right', 'top', 'wspace', 'hspace')}
+
+    def reset(self):
+        """Put the figure back as it was built: the last chart's ticks, labels, margins and
+        data limits cleared, and the axes where the tight layout found them before any draw"""
+        self.ax.clear()
+        # clear() leaves the data limits, which a chart with no data would keep
+        self.ax.relim()
+        self.figure.subplots_adjust(**self._subplot_params)
+        self.setup(self.ax)
+
+    def setup(self, ax):
+        pass
+
+    def draw(self, ax, metrics):
+        """Draw metrics on ax"""
+        raise NotImplementedError
+
+    @classmethod
+    def spec(cls, metrics):
+        """A JSON-serialisable description of the chart of metrics"""
+        raise NotImplementedError
+
+    def render(self, metrics, dpi=150):
+        self.reset()
+        self.draw(self.ax, metrics)
+
+        buf = io.BytesIO()
+        self.figure.savefig(buf, format='png', dpi=dpi, bbox_inches='tight')
+        return buf.getvalue()
+
+
+class MetricsBarChart(ChartTemplate):
+    """The web app's metrics chart: one labelled bar per metric"""
+
+    title = 'Financial Metrics'
+    y_label = 'Amount ($)'
+    label_rotation = 45
+
+    @staticmethod
+    def labels(metrics):
+        return [name.replace('_', ' ').title() for name in metrics.keys()]
+
+    @staticmethod
+    def colors(count):
+        return [BAR_COLORS[i % len(BAR_COLORS)] for i in range(count)]
+
+    def setup(self, ax):
+        ax.set_title(self.title, fontweight='bold')
+        ax.set_ylabel(self.y_label)
+
+    def draw(self, ax, metrics):
+        names = self.labels(metrics)
+        values = list(metrics.values())
+        positions = range(len(values))
+        colors = self.colors(len(values))
+
+        bars = ax.bar(positions, values, color=colors)
+        ax.set_xticks(list(positions))
+        ax.set_xticklabels(names, rotation=self.label_rotation)
+
+        for bar in bars:
+            height = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width()/2., height,
+                    f'${height:,.0f}', ha='center', va='bottom', fontweight='bold')
+
+    @classmethod
+    def spec(cls, metrics):
+        values = list(metrics.values())
+        return {
+            'version': SPEC_VERSION,
+            'type': 'bar',
+            'title': cls.title,
+            'y_label': cls.y_label,
+            'labels': cls.labels(metrics),
+            'series': [{'name': 'Amount', 'values': values, 'colors': cls.colors(len(values))}],
+            # Value labels and axis ticks: prefix, then the number with thousands separators
+            'format': {'prefix': '$', 'decimals': 0, 'grouping': True},
+            'label_rotation': cls.label_rotation,
+        }
+
+
+CHART_TYPES = {
+    'metrics_bar': MetricsBarChart,
+}
+
+
+class ChartRenderer:
+    """Renders charts to PNG bytes from any thread.
+
+    A template is checked out for the duration of one render, so no figure is
+    ever drawn on by two threads. pyplot is never touched. Up to pool_size idle templates per chart type
+    are kept for reuse; under heavier concurrency extra ones are built and
+    dropped afterwards.
+    """
+
+    def __init__(self, pool_size=CHART_POOL_SIZE, chart_types=CHART_TYPES):
+        self.chart_types = chart_types
+        self._pools = {name: queue.LifoQueue(maxsize=max(1, pool_size)) for name in chart_types}
+
+    def render(self, chart_type, metrics, dpi=150):
+        pool = self._pools[chart_type]
+        try:
+            template = pool.get_nowait()
+        except queue.Empty:
+            template = self.chart_types[chart_type]()
+        png = template.render(metrics, dpi=dpi)
+        # A template that failed mid-render is dropped rather than reused
+        try:
+            pool.put_nowait(template)
+        except queue.Full:
+            pass
+        return png
+
+
+_renderer = ChartRenderer()
+
+
+def render_chart(chart_type, metrics, dpi=150):
+    """PNG bytes of a chart_type chart of metrics, using the shared renderer"""
+    return _renderer.render(chart_type, metrics, dpi=dpi)
+
+
+def chart_spec(chart_type, metrics):
+    """Declarative description of a chart_type chart of metrics, for rendering in the browser"""
+    return CHART_TYPES[chart_type].spec(metrics)
+
+
+@functools.lru_cache(maxsize=None)
+def _matplotlib_version():
+    # From the package metadata, so naming a chart doesn't import matplotlib
+    try:
+        return metadata.version('matplotlib')
+    except metadata.PackageNotFoundError:
+        return matplotlib.__version__
+
+
+def chart_key(chart_type, metrics, dpi=150):
+    """Hex digest naming the PNG for these inputs; the matplotlib version is part of it"""
+    payload = json.dumps([chart_type, metrics, {'dpi': dpi}, _matplotlib_version()], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def is_chart_key(key):
+    return len(key) == 64 and all(c in '0123456789abcdef' for c in key)
+
+
+_chart_caches = {}
+_chart_cache_lock = threading.Lock()
+
+
+def chart_cache(suffix=CHART_SUFFIX):
+    """The rendered PNGs, or with suffix=CHART_REQUEST_SUFFIX the charts waiting to be rendered"""
+    with _chart_cache_lock:
+        if suffix not in _chart_caches:
+            _chart_caches[suffix] = DiskCache(CHART_CACHE_DIR, CHART_CACHE_MAX_BYTES, suffix=suffix)
+        return _chart_caches[suffix]
+
+
+def cached_chart(chart_type, metrics, dpi=150):
+    """Key of the chart for metrics, rendering and storing it only if it isn't cached yet"""
+    key = chart_key(chart_type, metrics, dpi)
+    cache = chart_cache()
+    if not cache.touch(key):
+        cache.put(key, render_chart(chart_type, metrics, dpi=dpi))
+    return key
+
+
+def deferred_chart(chart_type, metrics, dpi=150):
+    """Key of the chart for metrics without rendering it; load_chart() renders it when first asked"""
+    key = chart_key(chart_type, metrics, dpi)
+    requests = chart_cache(CHART_REQUEST_SUFFIX)
+    if not chart_cache().touch(key) and not requests.touch(key):
+        requests.put(key, json.dumps({'type': chart_type, 'metrics': metrics, 'dpi': dpi}).encode('utf-8'))
+    return key
+
+
+def chart_exists(key):
+    """True if load_chart(key) would find a PNG: rendered, or waiting to be rendered"""
+    return is_chart_key(key) and (chart_cache().touch(key) or chart_cache(CHART_REQUEST_SUFFIX).touch(key))
+
+
+def load_chart(key):
+    """PNG bytes for a key from cached_chart() or deferred_chart(), or None if unknown or evicted"""
+    if not is_chart_key(key):
+        return None
+    png = chart_cache().get(key)
+    if png is None:
+        data = chart_cache(CHART_REQUEST_SUFFIX).get(key)
+        if data is None:
+            return None
+        request = json.loads(data)
+        png = render_chart(request['type'], request['metrics'], dpi=request['dpi'])
+        chart_cache().put(key, png)
+    return png
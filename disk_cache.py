@@ -0,0 +1,104 @@
+"""Content-addressed on-disk cache with size-bounded LRU eviction"""
+import hashlib
+import os
+import tempfile
+import threading
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def sha256_of(source):
+    """SHA-256 hex digest of a path, bytes or seekable binary file object"""
+    digest = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as stream:
+            for block in iter(lambda: stream.read(HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    else:
+        position = source.tell()
+        source.seek(0)
+        for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+        source.seek(position)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """A directory of blobs named by key.
+
+    Reads bump the file's mtime, so mtime order is recency order; after every
+    write the oldest entries are removed until the directory fits in max_bytes.
+    Writes go through a temporary file and os.replace, so concurrent readers
+    (threads or processes) never see a partial entry.
+    """
+
+    def __init__(self, directory, max_bytes, suffix=''):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        path = self.path_for(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def touch(self, key):
+        """Mark key as recently used; False if it isn't cached"""
+        try:
+            os.utime(self.path_for(key))
+            return True
+        except OSError:
+            return False
+
+    def put(self, key, data):
+        """Store data under key; a cache that can't be written to (full, read-only, removed) just misses"""
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path_for(key))
+            self.evict()
+        except OSError:
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def evict(self):
+        """Delete least-recently-used entries until the cache fits in max_bytes"""
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(self.suffix) or entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                    total -= size
+                except OSError:
+                    continue
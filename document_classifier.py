@@ -0,0 +1,93 @@
+"""Keyword heuristic that decides whether a page (or document) holds financial content"""
+import re
+
+FINANCIAL_KEYWORDS = [
+    'balance sheet', 'income statement', 'cash flow', 'financial statement',
+    'financial report', 'annual report', 'quarterly report', 'earnings report',
+    'revenue', 'sales', 'gross profit', 'net income', 'net profit',
+    'operating income', 'ebitda', 'ebit', 'earnings', 'profit', 'loss',
+    'assets', 'liabilities', 'equity', 'capital', 'retained earnings',
+    'current assets', 'fixed assets', 'current liabilities', 'long-term debt',
+    'accounts payable', 'accounts receivable', 'inventory', 'cash',
+    'depreciation', 'amortization', 'cost of goods sold', 'operating expenses',
+    'profit margin', 'gross margin', 'return on assets', 'return on equity',
+    'debt to equity', 'current ratio', 'quick ratio', 'earnings per share'
+]
+KEYWORD_POINTS = 2
+
+CURRENCY_PATTERNS = [
+    r'\$\s*\d+[,\.]?\d*\s*(?:million|billion|thousand|M|B|K)?',
+    r'\d+[,\.]?\d*\s*(?:million|billion|thousand|M|B|K)\s*(?:USD|EUR|GBP)?'
+]
+CURRENCY_POINTS = 3
+
+STATEMENT_INDICATORS = [
+    r'balance\s+sheet',
+    r'income\s+statement',
+    r'cash\s+flow',
+    r'financial\s+position'
+]
+STATEMENT_POINTS = 5
+
+FINANCIAL_THRESHOLD = 15
+
+# Shortest first; a keyword containing another ('current assets' -> 'assets')
+# can only be present if that one is, so it is skipped when that one is absent
+_KEYWORDS = sorted(FINANCIAL_KEYWORDS, key=len)
+_CONTAINED = {keyword: [other for other in FINANCIAL_KEYWORDS if other != keyword and other in keyword]
+              for keyword in FINANCIAL_KEYWORDS}
+
+_DOLLAR_FIGURE = re.compile(CURRENCY_PATTERNS[0])
+# Text is lowercased, so of CURRENCY_PATTERNS[1]'s units only these words can match
+_UNIT_WORDS = ('million', 'billion', 'thousand')
+_STATEMENTS = [re.compile(pattern) for pattern in STATEMENT_INDICATORS]
+
+
+def _count_scaled_figures(text):
+    """Number of CURRENCY_PATTERNS[1] matches in lowercased text.
+
+    Each match ends in exactly one unit word, so rather than trying the
+    pattern at every digit, find the unit words and check what precedes them:
+    optional whitespace after a digit, or after ',' or '.' that follows a digit.
+    """
+    count = 0
+    for unit in _UNIT_WORDS:
+        position = text.find(unit)
+        while position != -1:
+            end = position
+            while end > 0 and text[end - 1].isspace():
+                end -= 1
+            if end > 0 and (text[end - 1].isdecimal() or
+                            (text[end - 1] in ',.' and end > 1 and text[end - 2].isdecimal())):
+                count += 1
+            position = text.find(unit, position + len(unit))
+    return count
+
+
+def financial_score(text):
+    """Keyword, currency and statement-heading score of text"""
+    text_lower = text.lower()
+    present = set()
+    for keyword in _KEYWORDS:
+        if all(other in present for other in _CONTAINED[keyword]) and keyword in text_lower:
+            present.add(keyword)
+    score = KEYWORD_POINTS * len(present)
+
+    if '$' in text_lower:
+        score += CURRENCY_POINTS * len(_DOLLAR_FIGURE.findall(text_lower))
+    score += CURRENCY_POINTS * _count_scaled_figures(text_lower)
+
+    for indicator in _STATEMENTS:
+        if indicator.search(text_lower):
+            score += STATEMENT_POINTS
+    return score
+
+
+def score_pages(pages):
+    """Financial score of each page, in one call"""
+    return [financial_score(page) for page in pages]
+
+
+def is_financial(text):
+    """True if text scores as financial content"""
+    return financial_score(text) >= FINANCIAL_THRESHOLD
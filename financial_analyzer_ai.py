@@ -1,17 +1,22 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-import PyPDF2
-import re
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.animation as animation
-import numpy as np
-import pandas as pd
 from datetime import datetime, timedelta
 import os
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
 import warnings
+from document_classifier import FINANCIAL_THRESHOLD, is_financial, score_pages
+from pdf_extraction import PAGE_BUDGET, open_document
+from metric_patterns import METRIC_PATTERNS
+from report_stream import StreamingMetricExtractor
+from gui_worker import AnalysisWorker, ProgressPanel, page_counts, pages_label
+from chart_canvas import ChartCanvas
+from animation_engine import BlitAnimation, ParticleSystem
+from lazy_import import lazy_import
+
+# Loaded on first use - the charts, the ML models and PDF preview - so the window opens without waiting for them
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+linear_model = lazy_import('sklearn.linear_model')
+ensemble = lazy_import('sklearn.ensemble')
 warnings.filterwarnings('ignore')
 
 class AIFinancialAnalyzer:
@@ -32,10 +37,13 @@ class AIFinancialAnalyzer:
         
         # Initialize variables
         self.metrics = None
+        self.metric_sources = {}  # Where each metric was found: page and character offsets
+        self.chart = None  # The window's one figure and canvas, made at the first chart
         self.canvas = None
         self.fig = None
         self.ax = None
         self.current_file_data = None  # Track current file's data
+        self.worker = None
         
         self.setup_ui()
         
@@ -101,6 +109,9 @@ class AIFinancialAnalyzer:
                                     state='disabled')
         self.analyze_btn.pack(side='left')
         
+        # Progress bar and Cancel button, shown while an analysis runs
+        self.progress = ProgressPanel(file_frame, length=200)
+        
         # AI Analysis Section
         ai_frame = tk.LabelFrame(scrollable_frame, text="🧠 AI Analysis", 
                                 font=('Arial', 9, 'bold'), bg='#34495e', fg='white',
@@ -258,50 +269,7 @@ class AIFinancialAnalyzer:
 
     def is_financial_document(self, text):
         """Check if the document contains financial content"""
-        financial_keywords = [
-            'balance sheet', 'income statement', 'cash flow', 'financial statement',
-            'financial report', 'annual report', 'quarterly report', 'earnings report',
-            'revenue', 'sales', 'gross profit', 'net income', 'net profit',
-            'operating income', 'ebitda', 'ebit', 'earnings', 'profit', 'loss',
-            'assets', 'liabilities', 'equity', 'capital', 'retained earnings',
-            'current assets', 'fixed assets', 'current liabilities', 'long-term debt',
-            'accounts payable', 'accounts receivable', 'inventory', 'cash',
-            'depreciation', 'amortization', 'cost of goods sold', 'operating expenses',
-            'profit margin', 'gross margin', 'return on assets', 'return on equity',
-            'debt to equity', 'current ratio', 'quick ratio', 'earnings per share'
-        ]
-        
-        text_lower = text.lower()
-        financial_score = 0
-        
-        for keyword in financial_keywords:
-            if keyword in text_lower:
-                financial_score += 2
-        
-        # Check for financial number patterns
-        currency_patterns = [
-            r'\$\s*\d+[,\.]?\d*\s*(?:million|billion|thousand|M|B|K)?',
-            r'\d+[,\.]?\d*\s*(?:million|billion|thousand|M|B|K)\s*(?:USD|EUR|GBP)?'
-        ]
-        
-        for pattern in currency_patterns:
-            matches = re.findall(pattern, text_lower)
-            if matches:
-                financial_score += len(matches) * 3
-        
-        # Check for financial statement structure
-        statement_indicators = [
-            r'balance\s+sheet',
-            r'income\s+statement', 
-            r'cash\s+flow',
-            r'financial\s+position'
-        ]
-        
-        for indicator in statement_indicators:
-            if re.search(indicator, text_lower):
-                financial_score += 5
-        
-        return financial_score >= 15
+        return is_financial(text)
 
     def select_file(self):
         """Handle PDF file selection with validation"""
@@ -313,44 +281,38 @@ class AIFinancialAnalyzer:
             
             if file_path:
                 try:
-                    with open(file_path, 'rb') as file:
-                        pdf_reader = PyPDF2.PdfReader(file)
-                        if len(pdf_reader.pages) == 0:
-                            messagebox.showerror("Invalid File", "The selected PDF appears to be empty or corrupted.")
-                            return
-                        
-                        # Extract text for validation
-                        preview_text = ""
-                        max_pages_to_check = min(3, len(pdf_reader.pages))
-                        for i in range(max_pages_to_check):
-                            try:
-                                page_text = pdf_reader.pages[i].extract_text()
-                                if page_text:
-                                    preview_text += page_text + "\n"
-                            except:
-                                continue
-                        
-                        if not preview_text.strip():
-                            messagebox.showerror("Invalid File", "Cannot read text from the PDF.")
-                            return
-                        
-                        # Check if it's a financial document
-                        is_financial = self.is_financial_document(preview_text)
-                        
-                        if not is_financial:
-                            filename = os.path.basename(file_path)
-                            messagebox.showerror(
-                                "Non-Financial Document", 
-                                f"❌ This document does not appear to be a financial report.\n\n"
-                                f"File: {filename}\n"
-                                f"Please select a valid financial document."
-                            )
-                            return
-                        else:
-                            self.file_path = file_path
-                            filename = os.path.basename(file_path)
-                            self.file_label.config(text=f"Selected:\n{filename}", fg='#2ecc71')
-                            self.analyze_btn.config(state='normal', bg='#27ae60')
+                    # Kept open with the pages read here, so the analysis carries on from them
+                    document = open_document(file_path)
+                    if document.page_count == 0:
+                        messagebox.showerror("Invalid File", "The selected PDF appears to be empty or corrupted.")
+                        return
+                    
+                    # Extract text for validation
+                    preview_text = "".join(page_text + "\n"
+                                           for page_text in document.iter_pages(cache=False, max_pages=3)
+                                           if page_text)
+                    
+                    if not preview_text.strip():
+                        messagebox.showerror("Invalid File", "Cannot read text from the PDF.")
+                        return
+                    
+                    # Check if it's a financial document
+                    is_financial = self.is_financial_document(preview_text)
+                    
+                    if not is_financial:
+                        filename = os.path.basename(file_path)
+                        messagebox.showerror(
+                            "Non-Financial Document", 
+                            f"❌ This document does not appear to be a financial report.\n\n"
+                            f"File: {filename}\n"
+                            f"Please select a valid financial document."
+                        )
+                        return
+                    else:
+                        self.file_path = file_path
+                        filename = os.path.basename(file_path)
+                        self.file_label.config(text=f"Selected:\n{filename}", fg='#2ecc71')
+                        self.analyze_btn.config(state='normal', bg='#27ae60')
                 
                 except Exception as e:
                     messagebox.showerror("File Error", f"Cannot read the selected file: {str(e)}")
@@ -359,132 +321,85 @@ class AIFinancialAnalyzer:
         except Exception as e:
             messagebox.showerror("File Error", f"Error selecting file: {str(e)}")
 
-    def extract_text_from_pdf(self, file_path):
-        """Extract text from PDF file"""
+    def extract_text_from_pdf(self, file_path, progress=None):
+        """Extract text from PDF file, with where each metric's figure was found (the
+        extractor's sources()); progress(pages_read), if given, is called after each page"""
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                financial_pages = 0
-                
-                for page in pdf_reader.pages:
-                    try:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-                            if self.is_financial_document(page_text):
-                                financial_pages += 1
-                    except:
-                        continue
-                
-                return text, len(pdf_reader.pages), financial_pages
+            extractor = StreamingMetricExtractor(METRIC_PATTERNS['ai'], lowercase=True)
+            chunks = []
+            pages_read = 0
+            
+            # Continues from the pages select_file() already read, unless the file has changed since
+            pages = open_document(file_path).iter_pages(max_pages=PAGE_BUDGET)
+            try:
+                for pages_read, page_text in enumerate(pages, 1):
+                    if page_text:
+                        chunks.append(page_text + "\n")
+                        extractor.feed(page_text + "\n", page=pages_read)
+                    if progress:
+                        progress(pages_read)
+                    # Every metric has its best match; later pages can't change the result
+                    if extractor.complete:
+                        break
+            finally:
+                pages.close()
+            
+            # Classify every page read in one batch pass
+            financial_pages = sum(1 for score in score_pages(chunks) if score >= FINANCIAL_THRESHOLD)
+            return "".join(chunks), pages_read, financial_pages, extractor.sources()
                     
         except Exception as e:
-            return None, 0, 0
+            return None, 0, 0, {}
 
-    def extract_financial_metrics(self, text):
-        """Extract financial metrics from text - IMPROVED TO USE REAL DATA"""
+    def extract_financial_metrics(self, text, sources):
+        """(metrics, sources) from the matches extract_text_from_pdf() found - IMPROVED TO USE REAL DATA"""
         if text is None:
-            return None
+            return None, {}
             
         print("🔍 Extracting financial metrics from document...")
         
         # Try to extract real metrics with improved patterns
-        extracted_metrics = self.try_extract_real_metrics(text)
+        extracted_metrics, metric_sources = self.try_extract_real_metrics(text, sources)
         
         if extracted_metrics:
             print("✅ Successfully extracted REAL financial metrics from document")
             print(f"📊 Extracted metrics: {extracted_metrics}")
-            return extracted_metrics
+            return extracted_metrics, metric_sources
         
         print("❌ Could not extract specific metrics from this document")
-        return None
+        return None, metric_sources
 
-    def try_extract_real_metrics(self, text):
-        """Try to extract real financial metrics from text with IMPROVED patterns"""
+    def try_extract_real_metrics(self, text, sources):
+        """Scale each metric's match by the units around it, with IMPROVED patterns"""
         metrics = {}
+        metric_sources = {}
         text_lower = text.lower()
         
-        # Enhanced patterns for better extraction
-        patterns = {
-            'revenue': [
-                r'revenue\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)\s*(?:million|billion|thousand|M|B|K)?',
-                r'total\s+revenue\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)',
-                r'sales\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)',
-                r'revenue\s+[\$](\d+(?:[,\.]\d+)*)',
-                r'income\s+from\s+operations\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)'
-            ],
-            'net_income': [
-                r'net\s+income\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)',
-                r'net\s+profit\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)',
-                r'net\s+earnings\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)',
-                r'profit\s+after\s+tax\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)',
-                r'net\s+[\$](\d+(?:[,\.]\d+)*)'
-            ],
-            'assets': [
-                r'total\s+assets\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)',
-                r'assets\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)',
-                r'total\s+assets\s+[\$](\d+(?:[,\.]\d+)*)',
-                r'property.*equipment\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)'
-            ],
-            'profit': [
-                r'gross\s+profit\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)',
-                r'operating\s+profit\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)',
-                r'profit\s+before\s+tax\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)',
-                r'gross\s+[\$](\d+(?:[,\.]\d+)*)'
-            ],
-            'ebitda': [
-                r'ebitda\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)',
-                r'earnings.*before.*interest.*tax.*depreciation.*amortization\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)'
-            ],
-            'liabilities': [
-                r'total\s+liabilities\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)',
-                r'liabilities\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)',
-                r'debt\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)'
-            ],
-            'equity': [
-                r'total\s+equity\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)',
-                r'equity\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)',
-                r'shareholders\'\s+equity\s*:?\s*[\$]?\s*(\d+(?:[,\.]\d+)*)'
-            ]
-        }
-        
-        for metric, pattern_list in patterns.items():
-            for pattern in pattern_list:
-                matches = re.findall(pattern, text_lower)
-                if matches:
-                    try:
-                        # Take the first match
-                        value_str = matches[0].replace(',', '').replace(' ', '')
-                        value = float(value_str)
-                        
-                        # Scale based on units in context
-                        context_start = max(0, text_lower.find(matches[0]) - 100)
-                        context_end = min(len(text_lower), text_lower.find(matches[0]) + 100)
-                        context = text_lower[context_start:context_end]
-                        
-                        # Check for scale indicators
-                        if any(unit in context for unit in ['billion', 'B']):
-                            value *= 1000000000
-                        elif any(unit in context for unit in ['million', 'M']):
-                            value *= 1000000
-                        elif any(unit in context for unit in ['thousand', 'K']):
-                            value *= 1000
-                            
-                        metrics[metric] = value
-                        print(f"📈 Extracted {metric}: ${value:,.2f}")
-                        break
-                    except ValueError as ve:
-                        print(f"⚠️ Value error for {metric}: {ve}")
-                        continue
+        for metric, source in sources.items():
+            value, start, end = source['value'], source['start'], source['end']
+            
+            # Scale based on units in the text around this match
+            context = text_lower[max(0, start - 100):end + 100]
+            
+            # Check for scale indicators
+            if any(unit in context for unit in ['billion', 'B']):
+                value *= 1000000000
+            elif any(unit in context for unit in ['million', 'M']):
+                value *= 1000000
+            elif any(unit in context for unit in ['thousand', 'K']):
+                value *= 1000
+                
+            metrics[metric] = value
+            metric_sources[metric] = dict(source, value=value)
+            print(f"📈 Extracted {metric}: ${value:,.2f} (page {source['page']}, chars {start}-{end})")
         
         # Only return if we found substantial real data
         if len(metrics) >= 3:  # Require at least 3 key metrics
             print(f"🎯 SUCCESS: Found {len(metrics)} real metrics from document")
-            return metrics
+            return metrics, metric_sources
         else:
             print(f"⚠️ INSUFFICIENT DATA: Only found {len(metrics)} metrics")
-            return None
+            return None, metric_sources
 
     def analyze_report(self):
         """Analyze the selected PDF report - USING REAL DATA ONLY"""
@@ -492,25 +407,59 @@ class AIFinancialAnalyzer:
             messagebox.showerror("Error", "Please select a PDF file first.")
             return
         
+        if self.worker and self.worker.running:
+            return
+        
         self.analyze_btn.config(state='disabled', text="⏳ Analyzing...", bg='#95a5a6')
-        self.root.update()
+        self.progress.start(self.cancel_analysis)
         
+        # Reset previous data
+        self.metrics = None
+        self.metric_sources = {}
+        self.prediction_data = None
+        self.historical_data = None
+        self.ml_models = {}
+        
+        file_path = self.file_path
+        # Reading runs on a worker thread so the window stays responsive; results come back via show_analysis
+        self.worker = AnalysisWorker(self.root, lambda progress: self.run_analysis(file_path, progress),
+                                     on_progress=self.progress.update_progress,
+                                     on_done=self.show_analysis,
+                                     on_error=self.analysis_failed,
+                                     on_cancel=self.analysis_finished).start()
+    
+    def run_analysis(self, file_path, progress):
+        """The slow part of an analysis; runs on the worker thread, so it must not touch widgets"""
+        page_count, total = page_counts(file_path)
+        text, pages_read, financial_pages, sources = self.extract_text_from_pdf(
+            file_path, progress=lambda pages_read: progress(pages_read, total))
+        # Extract REAL metrics only - no fallback to sample data
+        metrics, metric_sources = self.extract_financial_metrics(text, sources)
+        return text, (pages_read, page_count), financial_pages, metrics, metric_sources
+    
+    def cancel_analysis(self):
+        self.worker.cancel()
+        self.progress.cancelling()
+    
+    def analysis_failed(self, e):
+        self.analysis_finished()
+        self.report_failure(e)
+    
+    def report_failure(self, e):
+        messagebox.showerror("Analysis Error", f"Analysis failed: {str(e)}")
+    
+    def analysis_finished(self):
+        self.progress.finish()
+        self.analyze_btn.config(state='normal', text="🚀 Analyze", bg='#27ae60')
+    
+    def show_analysis(self, analysis):
+        """Display a finished analysis from run_analysis()"""
+        text, (pages_read, page_count), financial_pages, self.metrics, self.metric_sources = analysis
         try:
-            # Reset previous data
-            self.metrics = None
-            self.prediction_data = None
-            self.historical_data = None
-            self.ml_models = {}
-            
-            text, total_pages, financial_pages = self.extract_text_from_pdf(self.file_path)
-            
             if text is None:
                 messagebox.showerror("Analysis Error", "Cannot analyze this document.")
                 return
             
-            # Extract REAL metrics only - no fallback to sample data
-            self.metrics = self.extract_financial_metrics(text)
-            
             if self.metrics is None:
                 messagebox.showerror(
                     "Analysis Error", 
@@ -523,6 +472,7 @@ class AIFinancialAnalyzer:
             # Store current file data
             self.current_file_data = {
                 'metrics': self.metrics.copy(),
+                'sources': dict(self.metric_sources),
                 'filename': os.path.basename(self.file_path),
                 'analysis_time': datetime.now()
             }
@@ -533,8 +483,9 @@ class AIFinancialAnalyzer:
             self.summary_text.delete(1.0, tk.END)
             summary_content = f"📋 FINANCIAL ANALYSIS REPORT\n{'='*50}\n\n"
             summary_content += f"📄 Document: {os.path.basename(self.file_path)}\n"
-            summary_content += f"📊 Total Pages: {total_pages}\n"
-            summary_content += f"💰 Financial Pages: {financial_pages}\n"
+            summary_content += f"📊 Total Pages: {page_count or pages_read}\n"
+            summary_content += f"📖 Pages Read: {pages_label(pages_read, page_count)}\n"
+            summary_content += f"💰 Financial Pages: {financial_pages} (of the pages read)\n"
             summary_content += f"📈 Metrics Extracted: {len(self.metrics)}\n"
             summary_content += f"💵 Total Value: ${sum(self.metrics.values()):,.2f}\n\n"
             
@@ -542,7 +493,11 @@ class AIFinancialAnalyzer:
             main_metrics = ['revenue', 'net_income', 'assets', 'profit', 'ebitda', 'liabilities', 'equity']
             for metric in main_metrics:
                 if metric in self.metrics:
-                    summary_content += f"• {metric.replace('_', ' ').title():<20}: ${self.metrics[metric]:,.2f}\n"
+                    summary_content += f"• {metric.replace('_', ' ').title():<20}: ${self.metrics[metric]:,.2f}"
+                    source = self.metric_sources.get(metric)
+                    if source and source['page']:
+                        summary_content += f"  (page {source['page']}: \"{source['match']}\")"
+                    summary_content += "\n"
             
             self.summary_text.insert(1.0, summary_content)
             
@@ -579,9 +534,10 @@ class AIFinancialAnalyzer:
             )
             
         except Exception as e:
-            messagebox.showerror("Analysis Error", f"Analysis failed: {str(e)}")
+            # Not analysis_failed(): the finally below calls analysis_finished()
+            self.report_failure(e)
         finally:
-            self.analyze_btn.config(state='normal', text="🚀 Analyze", bg='#27ae60')
+            self.analysis_finished()
 
     def update_summary_metrics(self):
         """Update the summary metrics box with REAL data"""
@@ -680,10 +636,10 @@ class AIFinancialAnalyzer:
                     X = np.arange(len(data)).reshape(-1, 1)
                     y = data
                     
-                    lr_model = LinearRegression()
+                    lr_model = linear_model.LinearRegression()
                     lr_model.fit(X, y)
                     
-                    rf_model = RandomForestRegressor(n_estimators=50, random_state=42, max_depth=5)
+                    rf_model = ensemble.RandomForestRegressor(n_estimators=50, random_state=42, max_depth=5)
                     rf_model.fit(X, y)
                     
                     self.ml_models[metric] = {
@@ -875,8 +831,8 @@ class AIFinancialAnalyzer:
     def safe_stop_animation(self):
         """Stop animation safely"""
         try:
-            if self.current_animation and hasattr(self.current_animation, 'event_source'):
-                self.current_animation.event_source.stop()
+            if self.current_animation:
+                self.current_animation.stop()
             self.current_animation = None
             self.animation_running = False
             self.start_btn.config(state='normal')
@@ -982,9 +938,9 @@ class AIFinancialAnalyzer:
                         line_progress = (progress - 0.5) / 0.5
                         line.set_data(x_pos, values)
                         line.set_alpha(line_progress)
-                        return list(bars) + [line]
                     else:
-                        return list(bars)
+                        line.set_data([], [])
+                    return list(bars) + [line]
                 
             elif graph_type == "ai_predict":
                 current_values = values
@@ -1016,7 +972,8 @@ class AIFinancialAnalyzer:
             self.ax.tick_params(axis='y', colors='white')
             self.ax.grid(True, alpha=0.2, color='white')
             
-            anim = animation.FuncAnimation(self.fig, animate, frames=60, interval=50, blit=False, repeat=True)
+            # Only the bars, lines and points are redrawn each frame; the axes are drawn once
+            anim = BlitAnimation(self.fig, animate, frames=60, interval=50)
             self.canvas.draw()
             return anim
             
@@ -1047,34 +1004,20 @@ class AIFinancialAnalyzer:
             self.ax.tick_params(axis='y', colors='white')
             self.ax.grid(True, alpha=0.2, color='white')
             
-            # Create particles based on REAL values
-            particles = []
-            for i, value in enumerate(values):
-                for j in range(8):
-                    particles.append({
-                        'x': i + np.random.uniform(-0.3, 0.3),
-                        'y': np.random.uniform(0, value),
-                        'speed': np.random.uniform(0.1, 0.3),
-                        'color': colors[i % len(colors)]
-                    })
-            
-            scatter = self.ax.scatter([p['x'] for p in particles], 
-                                    [p['y'] for p in particles],
-                                    s=20, c=[p['color'] for p in particles],
-                                    alpha=0.6, edgecolors='white')
+            # Create particles based on REAL values: 8 per bar, held in NumPy arrays
+            particles = ParticleSystem(values, per_bar=8, spread=0.3, speed_range=(0.1, 0.3))
+            scatter = particles.attach(self.ax.scatter(particles.positions[:, 0], particles.positions[:, 1],
+                                                       s=20, c=particles.colors(colors),
+                                                       alpha=0.6, edgecolors='white'))
             
             def animate(frame):
-                for p in particles:
-                    p['y'] += p['speed']
-                    if p['y'] > values[int(p['x'])]:
-                        p['y'] = 0
-                
-                scatter.set_offsets(np.array([[p['x'], p['y']] for p in particles]))
+                particles.step()
                 pulse = 0.5 + 0.3 * np.sin(frame * 0.1)
                 scatter.set_alpha(0.4 + 0.3 * pulse)
                 return [scatter]
             
-            anim = animation.FuncAnimation(self.fig, animate, frames=200, interval=50, blit=False, repeat=True)
+            anim = BlitAnimation(self.fig, animate, frames=200, interval=50)
+            self.canvas.draw()
             return anim
             
         except Exception as e:
@@ -1083,16 +1026,18 @@ class AIFinancialAnalyzer:
 
     def setup_graph(self):
         """Setup the graph with REAL data"""
-        for widget in self.graph_frame.winfo_children():
-            widget.destroy()
-        
         if not hasattr(self, 'metrics') or not self.metrics:
             return
         
         self.safe_stop_animation()
         
-        self.fig, self.ax = plt.subplots(figsize=(12, 7))
-        self.fig.patch.set_facecolor('#1a1a1a')
+        if self.chart is None:
+            # The placeholder goes; the figure and canvas made here serve every later chart
+            for widget in self.graph_frame.winfo_children():
+                widget.destroy()
+            self.chart = ChartCanvas(self.graph_frame, figsize=(12, 7))
+            self.fig, self.ax, self.canvas = self.chart.fig, self.chart.ax, self.chart.canvas
+        self.chart.clear()
         self.ax.set_facecolor('#2c3e50')
         
         self.ax.tick_params(colors='white')
@@ -1154,9 +1099,7 @@ class AIFinancialAnalyzer:
         self.ax.tick_params(axis='x', rotation=45)
         self.ax.grid(True, alpha=0.2)
         
-        self.canvas = FigureCanvasTkAgg(self.fig, self.graph_frame)
-        self.canvas.draw()
-        self.canvas.get_tk_widget().pack(fill='both', expand=True)
+        self.chart.show()
 
     def create_ai_prediction_static(self):
         """Create static AI prediction graph with REAL data"""
@@ -1188,9 +1131,7 @@ class AIFinancialAnalyzer:
         self.ax.legend()
         self.ax.grid(True, alpha=0.2)
         
-        self.canvas = FigureCanvasTkAgg(self.fig, self.graph_frame)
-        self.canvas.draw()
-        self.canvas.get_tk_widget().pack(fill='both', expand=True)
+        self.chart.show()
 
     def change_graph_type(self):
         """Change graph type with REAL data"""
@@ -1,13 +1,17 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-import PyPDF2
-import re
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.animation as animation
-import numpy as np
 import os
 from datetime import datetime
+from pdf_extraction import PAGE_BUDGET, extract_pages, iter_pages, join_pages
+from metric_patterns import METRIC_PATTERNS
+from report_stream import SentenceCounter, StreamingMetricExtractor, read_pages
+from gui_worker import AnalysisWorker, ProgressPanel, page_counts, pages_label
+from chart_canvas import ChartCanvas
+from animation_engine import BlitAnimation, ParticleSystem
+from lazy_import import lazy_import
+
+# Loaded when the first chart is drawn, so the window opens without waiting for them
+np = lazy_import('numpy')
 
 class FinancialAnalyzerGUI:
     def __init__(self, root):
@@ -20,9 +24,11 @@ class FinancialAnalyzerGUI:
         self.animation_running = False
         self.current_animation = None
         self.metrics = None
+        self.chart = None  # The window's one figure and canvas, made at the first chart
         self.canvas = None
         self.fig = None
         self.ax = None
+        self.worker = None
         
         self.setup_ui()
         
@@ -99,6 +105,9 @@ class FinancialAnalyzerGUI:
                                     state='disabled')
         self.analyze_btn.pack(pady=5)
         
+        # Progress bar and Cancel button, shown while an analysis runs
+        self.progress = ProgressPanel(file_frame)
+        
         # SUMMARY METRICS BOX (Compact)
         metrics_box = tk.LabelFrame(scrollable_frame, text="📊 Summary Metrics", 
                                   font=('Arial', 10, 'bold'),
@@ -434,45 +443,32 @@ class FinancialAnalyzerGUI:
     def extract_text_from_pdf(self, file_path):
         """Extract text from PDF file"""
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-                
-                return text if text.strip() else "No text found", len(pdf_reader.pages)
+            pages = extract_pages(file_path)
+            text = join_pages(pages)
+            
+            return text if text.strip() else "No text found", len(pages)
                     
         except Exception as e:
             return f"Error: {str(e)}", 0
     
+    def read_report(self, file_path, progress=None):
+        """Stream the PDF page by page, stopping once the metrics and summary are settled"""
+        extractor = StreamingMetricExtractor(METRIC_PATTERNS['enhanced'])
+        try:
+            text, pages_read = read_pages(iter_pages(file_path, max_pages=PAGE_BUDGET), extractor,
+                                          summary=SentenceCounter(min_length=20),
+                                          progress=progress)
+            if not text.strip():
+                text = "No text found"
+        except Exception as e:
+            text, pages_read = f"Error: {str(e)}", 0
+        return text, pages_read, extractor.metrics()
+    
     def extract_financial_metrics(self, text):
         """Extract financial metrics from text"""
-        metrics = {}
-        
-        patterns = {
-            'revenue': r'revenue.*?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-            'net_income': r'net income.*?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-            'assets': r'assets.*?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-            'profit': r'profit.*?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-            'ebitda': r'ebitda.*?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-            'expenses': r'expenses.*?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-            'liabilities': r'liabilities.*?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-            'equity': r'equity.*?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'
-        }
-        
-        for metric, pattern in patterns.items():
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                try:
-                    value = float(matches[0].replace(',', '').replace('$', ''))
-                    metrics[metric] = value
-                except:
-                    continue
-        
-        return metrics
+        extractor = StreamingMetricExtractor(METRIC_PATTERNS['enhanced'])
+        extractor.feed(text)
+        return extractor.metrics()
 
     def generate_summary(self, text):
         """Generate summary from text"""
@@ -531,13 +527,19 @@ class FinancialAnalyzerGUI:
         colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7', '#A29BFE']
         bars = self.ax.bar(names, [0]*len(values), color=colors[:len(values)], alpha=0.9, edgecolor='white', linewidth=2)
         
+        # One value label per bar, moved each frame; the static chart's labels make way for them
+        for txt in list(self.ax.texts):
+            txt.remove()
+        labels = [self.ax.text(0, 0, '', ha='center', va='bottom', fontweight='bold', fontsize=11, color='white')
+                  for _ in bars]
+        
         def ease_out_quart(x):
             return 1 - (1 - x) ** 4
         
         def animate(frame):
+            progress = min(frame / 60, 1.0)
+            eased_progress = ease_out_quart(progress)
             for i, bar in enumerate(bars):
-                progress = min(frame / 60, 1.0)
-                eased_progress = ease_out_quart(progress)
                 current_height = values[i] * eased_progress
                 bar.set_height(current_height)
                 
@@ -545,21 +547,15 @@ class FinancialAnalyzerGUI:
                     bar.set_alpha(0.7 + 0.3 * progress)
                 
                 # Update labels
-                for txt in self.ax.texts:
-                    txt.remove()
-                
-                for i, bar in enumerate(bars):
-                    height = bar.get_height()
-                    if height > values[i] * 0.1:
-                        alpha = min(height / values[i], 1.0)
-                        self.ax.text(bar.get_x() + bar.get_width()/2., height + (height * 0.02),
-                                   f'${height:,.0f}', ha='center', va='bottom', 
-                                   fontweight='bold', fontsize=11, color='white',
-                                   alpha=alpha)
-            return bars
+                label = labels[i]
+                label.set_visible(current_height > values[i] * 0.1)
+                label.set_position((bar.get_x() + bar.get_width()/2., current_height + (current_height * 0.02)))
+                label.set_text(f'${current_height:,.0f}')
+                label.set_alpha(min(current_height / values[i], 1.0) if values[i] else 1.0)
+            return list(bars) + labels
         
         interval = int(50 / self.speed_var.get())
-        return animation.FuncAnimation(self.fig, animate, frames=120, interval=interval, blit=False, repeat=True)
+        return BlitAnimation(self.fig, animate, frames=120, interval=interval)
 
     def create_particle_flow_animation(self):
         """Create particle flow animation"""
@@ -569,56 +565,38 @@ class FinancialAnalyzerGUI:
         colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7']
         bars = self.ax.bar(names, values, color=colors[:len(values)], alpha=0.8)
         
-        # Create particles
-        particles = []
-        for i, value in enumerate(values):
-            for j in range(5):
-                particles.append({
-                    'bar_idx': i,
-                    'x': i + np.random.uniform(-0.3, 0.3),
-                    'y': np.random.uniform(0, value),
-                    'speed': np.random.uniform(0.2, 0.6),
-                    'size': np.random.uniform(20, 60),
-                    'color': colors[i % len(colors)]
-                })
-        
-        scatter = self.ax.scatter([p['x'] for p in particles], 
-                                [p['y'] for p in particles],
-                                s=[p['size'] for p in particles],
-                                c=[p['color'] for p in particles],
-                                alpha=0.7, edgecolors='white', linewidths=0.5)
+        # Create particles: 5 per bar, held in NumPy arrays
+        particles = ParticleSystem(values, per_bar=5, spread=0.3, speed_range=(0.2 * 0.3, 0.6 * 0.3), sizes=(20, 60))
+        scatter = particles.attach(self.ax.scatter(particles.positions[:, 0], particles.positions[:, 1],
+                                                   s=particles.sizes, c=particles.colors(colors),
+                                                   alpha=0.7, edgecolors='white', linewidths=0.5))
         
         def animate(frame):
-            # Move particles
-            for p in particles:
-                p['y'] += p['speed'] * 0.3
-                if p['y'] > values[p['bar_idx']]:
-                    p['y'] = 0
-            
-            # Update scatter
-            scatter.set_offsets(np.array([[p['x'], p['y']] for p in particles]))
+            # Move particles; the scatter draws straight from their positions
+            particles.step()
             
             # Pulsing effect
             pulse = 0.6 + 0.4 * np.sin(frame * 0.1)
             scatter.set_alpha(0.5 + 0.3 * pulse)
             
-            return [scatter] + bars
+            return [scatter]
         
         interval = int(50 / self.speed_var.get())
-        return animation.FuncAnimation(self.fig, animate, frames=200, interval=interval, blit=False, repeat=True)
+        return BlitAnimation(self.fig, animate, frames=200, interval=interval)
 
     def setup_graph(self):
         """Setup the matplotlib graph based on selected type"""
-        # Clear previous graph
-        for widget in self.graph_frame.winfo_children():
-            widget.destroy()
-        
         # Stop any existing animation
         self.safe_stop_animation()
         
-        # Create new figure
-        self.fig, self.ax = plt.subplots(figsize=(12, 7))
-        self.fig.patch.set_facecolor('#1a1a1a')
+        # Clear the previous graph, reusing the window's figure and canvas
+        if self.chart is None:
+            # The placeholder goes; the figure and canvas made here serve every later chart
+            for widget in self.graph_frame.winfo_children():
+                widget.destroy()
+            self.chart = ChartCanvas(self.graph_frame, figsize=(12, 7))
+            self.fig, self.ax, self.canvas = self.chart.fig, self.chart.ax, self.chart.canvas
+        self.chart.clear()
         self.ax.set_facecolor('#2c3e50')
         
         # Professional styling
@@ -724,10 +702,8 @@ class FinancialAnalyzerGUI:
         self.ax.grid(True, alpha=0.2, color='white', linestyle='--')
         self.ax.tick_params(axis='y', colors='white', labelsize=10)
         
-        # Create canvas
-        self.canvas = FigureCanvasTkAgg(self.fig, self.graph_frame)
-        self.canvas.draw()
-        self.canvas.get_tk_widget().pack(fill='both', expand=True)
+        # Draw on the canvas
+        self.chart.show()
 
     def change_graph_type(self):
         """Change graph type when radio button is clicked"""
@@ -741,7 +717,7 @@ class FinancialAnalyzerGUI:
         try:
             if self.current_animation:
                 try:
-                    self.current_animation.event_source.stop()
+                    self.current_animation.stop()
                 except:
                     pass
                 self.current_animation = None
@@ -774,8 +750,7 @@ class FinancialAnalyzerGUI:
         try:
             if self.current_animation:
                 try:
-                    if hasattr(self.current_animation, 'event_source'):
-                        self.current_animation.event_source.stop()
+                    self.current_animation.stop()
                 except Exception as e:
                     print(f"Warning during stop: {e}")
                 finally:
@@ -800,15 +775,46 @@ class FinancialAnalyzerGUI:
             messagebox.showerror("Error", "Please select a PDF file first.")
             return
         
+        if self.worker and self.worker.running:
+            return
+        
         # Show loading
         self.analyze_btn.config(state='disabled', text="⏳ Analyzing...", bg='#95a5a6')
-        self.root.update()
-        
+        self.progress.start(self.cancel_analysis)
+        file_path = self.file_path
+        # Reading runs on a worker thread so the window stays responsive; results come back via show_analysis
+        self.worker = AnalysisWorker(self.root, lambda progress: self.run_analysis(file_path, progress),
+                                     on_progress=self.progress.update_progress,
+                                     on_done=self.show_analysis,
+                                     on_error=self.analysis_failed,
+                                     on_cancel=self.analysis_finished).start()
+    
+    def run_analysis(self, file_path, progress):
+        """The slow part of an analysis; runs on the worker thread, so it must not touch widgets"""
+        page_count, total = page_counts(file_path)
+        text, pages_read, metrics = self.read_report(
+            file_path, progress=lambda pages_read, page_text: progress(pages_read, total))
+        return text, pages_label(pages_read, page_count), metrics, self.generate_summary(text)
+    
+    def cancel_analysis(self):
+        self.worker.cancel()
+        self.progress.cancelling()
+    
+    def analysis_failed(self, e):
+        self.analysis_finished()
+        self.report_failure(e)
+    
+    def report_failure(self, e):
+        messagebox.showerror("Analysis Error", f"Analysis failed: {str(e)}")
+    
+    def analysis_finished(self):
+        self.progress.finish()
+        self.analyze_btn.config(state='normal', text="🚀 Analyze Report", bg='#27ae60')
+    
+    def show_analysis(self, analysis):
+        """Display a finished analysis from run_analysis()"""
+        text, pages_read, self.metrics, summary = analysis
         try:
-            # Extract and analyze
-            text, total_pages = self.extract_text_from_pdf(self.file_path)
-            summary = self.generate_summary(text)
-            self.metrics = self.extract_financial_metrics(text)
             
             # UPDATE THE SUMMARY METRICS BOX
             self.update_summary_metrics()
@@ -818,7 +824,7 @@ class FinancialAnalyzerGUI:
             summary_content = f"📋 EXECUTIVE SUMMARY\n{'='*40}\n\n"
             summary_content += f"Document Analysis Report\n"
             summary_content += f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-            summary_content += f"Pages Processed: {total_pages}\n"
+            summary_content += f"Pages Processed: {pages_read}\n"
             summary_content += f"Text Extracted: {len(text):,} characters\n\n"
             summary_content += f"Summary:\n{'-'*20}\n{summary}\n\n"
             
@@ -869,10 +875,11 @@ class FinancialAnalyzerGUI:
                 messagebox.showwarning("No Data", "Analysis complete but no financial metrics found.")
             
         except Exception as e:
-            messagebox.showerror("Analysis Error", f"Analysis failed: {str(e)}")
+            # Not analysis_failed(): the finally below calls analysis_finished()
+            self.report_failure(e)
             
         finally:
-            self.analyze_btn.config(state='normal', text="🚀 Analyze Report", bg='#27ae60')
+            self.analysis_finished()
 
 def main():
     try:
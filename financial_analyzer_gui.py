@@ -1,13 +1,35 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-import PyPDF2
-import re
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.animation as animation
-import numpy as np
 import os
-from matplotlib import gridspec
+from pdf_extraction import PAGE_BUDGET, extract_pages, iter_pages
+from metric_patterns import METRIC_PATTERNS
+from report_stream import StreamingMetricExtractor, read_pages
+from gui_worker import AnalysisWorker, ProgressPanel, page_counts, pages_label
+from chart_canvas import ChartCanvas
+from animation_engine import BlitAnimation
+from lazy_import import lazy_import
+
+# Loaded when the first chart is drawn, so the window opens without waiting for them
+np = lazy_import('numpy')
+
+class SummaryLines:
+    """For read_pages(): complete once the finished lines fed so far already hold the whole summary"""
+    
+    def __init__(self, summary_sentences, needed=5):
+        self.summary_sentences = summary_sentences
+        self.needed = needed
+        self.count = 0
+        self.pending = ""
+    
+    def feed(self, text):
+        # Only finished lines are counted, so just the last line of a chunk is carried over
+        lines = (self.pending + text).split('\n')
+        self.pending = lines.pop()
+        self.count += len(self.summary_sentences('\n'.join(lines)))
+    
+    @property
+    def complete(self):
+        return self.count >= self.needed
 
 class FinancialAnalyzerGUI:
     def __init__(self, root):
@@ -21,7 +43,8 @@ class FinancialAnalyzerGUI:
         
         self.animation_running = False
         self.current_animation = None
-        self.current_canvas = None
+        self.chart = None  # The window's one figure and canvas, made at the first chart
+        self.worker = None
         self.setup_ui()
         
     def setup_ui(self):
@@ -89,8 +112,8 @@ class FinancialAnalyzerGUI:
                                     cursor='hand2')
         self.analyze_btn.pack(pady=5)
         
-        # Progress bar
-        self.progress = ttk.Progressbar(upload_frame, mode='indeterminate', length=300)
+        # Progress bar and Cancel button, shown while an analysis runs
+        self.progress = ProgressPanel(upload_frame, bg='#f8f9fa', fg='#2c3e50', length=300)
         
         # Results Section - MAKING THIS MUCH LARGER
         results_frame = tk.LabelFrame(main_frame, 
@@ -273,91 +296,69 @@ class FinancialAnalyzerGUI:
     def clear_chart_container(self):
         """Clear the chart container completely"""
         for widget in self.chart_container.winfo_children():
-            widget.destroy()
+            if not (self.chart and self.chart.owns(widget)):
+                widget.destroy()
         
         if self.current_animation:
-            self.current_animation.event_source.stop()
+            self.current_animation.stop()
             self.current_animation = None
         
-        if self.current_canvas:
-            self.current_canvas.get_tk_widget().destroy()
-            self.current_canvas = None
+        # The canvas is only hidden; the next chart is drawn on it again
+        if self.chart:
+            self.chart.hide()
     
     def extract_text_from_pdf(self, file_path):
         """Extract text from PDF file"""
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                total_pages = len(pdf_reader.pages)
-                
-                for page_num in range(total_pages):
-                    page = pdf_reader.pages[page_num]
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += f"--- Page {page_num + 1} ---\n{page_text}\n\n"
-                
-                if text.strip():
-                    return text, total_pages
-                else:
-                    return "No readable text found in PDF", 0
+            pages = extract_pages(file_path)
+            total_pages = len(pages)
+            text = "".join(f"--- Page {page_num} ---\n{page_text}\n\n"
+                           for page_num, page_text in enumerate(pages, 1) if page_text)
+            
+            if text.strip():
+                return text, total_pages
+            else:
+                return "No readable text found in PDF", 0
                     
         except Exception as e:
             return f"Error reading PDF: {str(e)}", 0
     
+    def read_report(self, file_path, progress=None):
+        """Stream the PDF page by page, stopping once the metrics and summary are settled"""
+        extractor = StreamingMetricExtractor(METRIC_PATTERNS['gui'])
+        try:
+            text, pages_read = read_pages(iter_pages(file_path, max_pages=PAGE_BUDGET), extractor,
+                                          summary=SummaryLines(self.summary_sentences),
+                                          format_page=lambda page_num, page_text: f"--- Page {page_num} ---\n{page_text}\n\n",
+                                          progress=progress)
+            if not text.strip():
+                text, pages_read = "No readable text found in PDF", 0
+        except Exception as e:
+            text, pages_read = f"Error reading PDF: {str(e)}", 0
+        return text, pages_read, extractor.metrics()
+    
     def extract_financial_metrics(self, text):
         """Extract financial metrics from text"""
-        metrics = {}
-        
-        financial_terms = {
-            'revenue': [
-                r'revenue[\s\S]{0,200}?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                r'sales[\s\S]{0,200}?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                r'total revenue[\s\S]{0,200}?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'
-            ],
-            'net_income': [
-                r'net income[\s\S]{0,200}?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                r'net profit[\s\S]{0,200}?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                r'net earnings[\s\S]{0,200}?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'
-            ],
-            'assets': [
-                r'total assets[\s\S]{0,200}?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                r'assets[\s\S]{0,200}?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'
-            ],
-            'profit': [
-                r'profit[\s\S]{0,200}?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                r'gross profit[\s\S]{0,200}?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'
-            ],
-            'ebitda': [
-                r'ebitda[\s\S]{0,200}?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'
-            ]
-        }
-        
-        for metric, patterns in financial_terms.items():
-            for pattern in patterns:
-                matches = re.findall(pattern, text, re.IGNORECASE)
-                if matches:
-                    try:
-                        value_str = matches[0].replace('$', '').replace(',', '').strip()
-                        if value_str:
-                            metrics[metric] = float(value_str)
-                            break
-                    except (ValueError, IndexError):
-                        continue
-        
-        return metrics
+        extractor = StreamingMetricExtractor(METRIC_PATTERNS['gui'])
+        extractor.feed(text)
+        return extractor.metrics()
     
-    def generate_summary(self, text):
-        """Generate summary from text"""
-        if len(text) < 100:
-            return "Document too short for meaningful analysis."
-        
+    def summary_sentences(self, text):
+        """Sentences the summary is built from, in document order"""
         sentences = []
         for line in text.split('\n'):
             line = line.strip()
             if line and not line.startswith('--- Page') and len(line) > 30:
                 line_sentences = [s.strip() for s in line.split('.') if len(s.strip()) > 20]
                 sentences.extend(line_sentences)
+        return sentences
+    
+    def generate_summary(self, text):
+        """Generate summary from text"""
+        if len(text) < 100:
+            return "Document too short for meaningful analysis."
+        
+        sentences = self.summary_sentences(text)
         
         if sentences:
             summary = '. '.join(sentences[:5]) + '.'
@@ -386,6 +387,11 @@ class FinancialAnalyzerGUI:
         ax.tick_params(axis='x', colors='white', labelsize=12, rotation=45)
         ax.tick_params(axis='y', colors='white', labelsize=12)
         
+        # One value label per bar, moved each frame
+        labels = [ax.text(0, 0, '', ha='center', va='bottom', fontweight='bold', fontsize=11, color='white',
+                          bbox=dict(boxstyle="round,pad=0.3", facecolor='#2c3e50', alpha=0.8))
+                  for _ in bars]
+        
         def animate(frame):
             for i, bar in enumerate(bars):
                 target_height = values[i]
@@ -393,20 +399,14 @@ class FinancialAnalyzerGUI:
                 bar.set_height(current_height)
                 
                 # Update value labels
-                for txt in ax.texts:
-                    txt.remove()
-                
-                for i, bar in enumerate(bars):
-                    height = bar.get_height()
-                    if height > 0:  # Only show label when bar has height
-                        ax.text(bar.get_x() + bar.get_width()/2., height + (height * 0.02),
-                               f'${height:,.0f}', ha='center', va='bottom', 
-                               fontweight='bold', fontsize=11, color='white',
-                               bbox=dict(boxstyle="round,pad=0.3", facecolor='#2c3e50', alpha=0.8))
+                label = labels[i]
+                label.set_visible(current_height > 0)  # Only show label when bar has height
+                label.set_position((bar.get_x() + bar.get_width()/2., current_height + (current_height * 0.02)))
+                label.set_text(f'${current_height:,.0f}')
             
-            return bars
+            return list(bars) + labels
         
-        return animation.FuncAnimation(fig, animate, frames=100, interval=40, blit=False, repeat=True)
+        return BlitAnimation(fig, animate, frames=100, interval=40)
     
     def create_pulsing_animation(self, metrics, fig, ax):
         """Create pulsing chart animation"""
@@ -423,6 +423,13 @@ class FinancialAnalyzerGUI:
         ax.tick_params(axis='x', colors='white', labelsize=12, rotation=45)
         ax.tick_params(axis='y', colors='white', labelsize=12)
         
+        # The bars don't move, so their labels are placed once and only fade
+        labels = [ax.text(bar.get_x() + bar.get_width()/2., bar.get_height() * 1.02,
+                          f'${bar.get_height():,.0f}', ha='center', va='bottom',
+                          fontweight='bold', fontsize=11, color='white',
+                          bbox=dict(boxstyle="round,pad=0.3", facecolor='#2c3e50', alpha=0.8))
+                  for bar in bars]
+        
         def animate(frame):
             pulse = 0.6 + 0.4 * np.sin(frame * 0.2)
             for i, bar in enumerate(bars):
@@ -431,20 +438,12 @@ class FinancialAnalyzerGUI:
                 bar.set_linewidth(1 + pulse)
             
             # Pulsing value labels
-            for txt in ax.texts:
-                txt.remove()
+            for label in labels:
+                label.set_alpha(0.8 + 0.2 * pulse)
             
-            for i, bar in enumerate(bars):
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height + (height * 0.02),
-                       f'${height:,.0f}', ha='center', va='bottom', 
-                       fontweight='bold', fontsize=11, color='white',
-                       alpha=0.8 + 0.2 * pulse,
-                       bbox=dict(boxstyle="round,pad=0.3", facecolor='#2c3e50', alpha=0.8))
-            
-            return bars
+            return list(bars) + labels
         
-        return animation.FuncAnimation(fig, animate, frames=100, interval=50, blit=False, repeat=True)
+        return BlitAnimation(fig, animate, frames=100, interval=50)
     
     def create_animated_chart(self, metrics):
         """Create animated financial chart with LARGE size"""
@@ -462,12 +461,11 @@ class FinancialAnalyzerGUI:
             # Clear previous chart
             self.clear_chart_container()
             
-            # Create LARGE figure - using most of the container space
-            fig = plt.Figure(figsize=(14, 8), dpi=100)  # Much larger figure
-            fig.patch.set_facecolor('#1a1a1a')
-            
-            # Create axis that uses most of the figure space
-            ax = fig.add_subplot(111)
+            # LARGE figure - using most of the container space - made once, then cleared for each chart
+            if self.chart is None:
+                self.chart = ChartCanvas(self.chart_container, figsize=(14, 8), dpi=100, toolbar=True)
+            fig = self.chart.fig
+            ax = self.chart.clear()
             ax.set_facecolor('#2c3e50')
             
             # Set all text to white for better visibility
@@ -487,18 +485,8 @@ class FinancialAnalyzerGUI:
             else:
                 anim = self.create_growing_bars_animation(metrics, fig, ax)
             
-            # Embed LARGE chart in tkinter
-            self.current_canvas = FigureCanvasTkAgg(fig, self.chart_container)
-            self.current_canvas.draw()
-            
-            # Pack canvas to fill entire container
-            self.current_canvas.get_tk_widget().pack(fill='both', expand=True, padx=5, pady=5)
-            
-            # Add navigation toolbar
-            from matplotlib.backends.backend_tkagg import NavigationToolbar2Tk
-            toolbar = NavigationToolbar2Tk(self.current_canvas, self.chart_container)
-            toolbar.update()
-            toolbar.pack(side='bottom', fill='x')
+            # Show the LARGE chart, with its navigation toolbar, filling the entire container
+            self.chart.show(fill='both', expand=True, padx=5, pady=5)
             
             # Store animation reference
             self.current_animation = anim
@@ -538,25 +526,59 @@ class FinancialAnalyzerGUI:
             messagebox.showerror("Error", "Please select a PDF file first.")
             return
         
-        self.progress.pack(pady=10)
-        self.progress.start(10)
+        if self.worker and self.worker.running:
+            return
+        
         self.analyze_btn.config(state='disabled', bg='#95a5a6')
         self.status_label.config(text="Analyzing document...")
-        self.root.update()
-        
+        self.progress.start(self.cancel_analysis, pady=10)
+        file_path = self.file_path
+        # Reading runs on a worker thread so the window stays responsive; results come back via show_analysis
+        self.worker = AnalysisWorker(self.root, lambda progress: self.run_analysis(file_path, progress),
+                                     on_progress=self.progress.update_progress,
+                                     on_done=self.show_analysis,
+                                     on_error=self.analysis_failed,
+                                     on_cancel=self.analysis_cancelled).start()
+    
+    def run_analysis(self, file_path, progress):
+        """The slow part of an analysis; runs on the worker thread, so it must not touch widgets"""
+        page_count, total = page_counts(file_path)
+        text, pages_read, metrics = self.read_report(
+            file_path, progress=lambda pages_read, page_text: progress(pages_read, total))
+        return text, pages_label(pages_read, page_count), metrics, self.generate_summary(text)
+    
+    def cancel_analysis(self):
+        self.worker.cancel()
+        self.progress.cancelling()
+    
+    def analysis_cancelled(self):
+        self.analysis_finished()
+        self.status_label.config(text="Analysis cancelled.")
+    
+    def analysis_failed(self, e):
+        self.analysis_finished()
+        self.report_failure(e)
+    
+    def report_failure(self, e):
+        error_msg = f"Analysis failed: {str(e)}"
+        self.status_label.config(text=f"❌ {error_msg}")
+        messagebox.showerror("Analysis Error", error_msg)
+    
+    def analysis_finished(self):
+        self.progress.finish()
+        self.analyze_btn.config(state='normal', bg='#27ae60')
+    
+    def show_analysis(self, analysis):
+        """Display a finished analysis from run_analysis()"""
+        text, pages_read, metrics, summary = analysis
         try:
-            text, total_pages = self.extract_text_from_pdf(self.file_path)
-            self.status_label.config(text=f"Processing {total_pages} pages...")
-            self.root.update()
-            
-            summary = self.generate_summary(text)
-            metrics = self.extract_financial_metrics(text)
+            self.status_label.config(text=f"Pages processed: {pages_read}")
             self.metrics = metrics  # Store for animation changes
             
             # Display results in summary tab (compact)
             self.summary_text.delete(1.0, tk.END)
             summary_content = f"Document Analysis Summary:\n{'='*40}\n\n"
-            summary_content += f"Pages processed: {total_pages}\n"
+            summary_content += f"Pages processed: {pages_read}\n"
             summary_content += f"Text extracted: {len(text):,} characters\n\n"
             summary_content += f"Executive Summary:\n{'-'*20}\n{summary}"
             self.summary_text.insert(1.0, summary_content)
@@ -594,14 +616,11 @@ class FinancialAnalyzerGUI:
                               f"Check the LARGE Animated Visualizations tab for full-screen charts!")
             
         except Exception as e:
-            error_msg = f"Analysis failed: {str(e)}"
-            self.status_label.config(text=f"❌ {error_msg}")
-            messagebox.showerror("Analysis Error", error_msg)
+            # Not analysis_failed(): the finally below calls analysis_finished()
+            self.report_failure(e)
             
         finally:
-            self.progress.stop()
-            self.progress.pack_forget()
-            self.analyze_btn.config(state='normal', bg='#27ae60')
+            self.analysis_finished()
 
 def main():
     try:
@@ -0,0 +1,158 @@
+"""Run a report analysis off the Tk main thread, with progress and cancel for the GUIs"""
+import queue
+import threading
+import tkinter as tk
+from tkinter import ttk
+
+from pdf_extraction import PAGE_BUDGET, count_pages
+
+# Milliseconds between checks of the worker's message queue
+POLL_MS = 50
+
+
+class Cancelled(BaseException):
+    """Raised inside a cancelled analysis at its next progress report.
+
+    A BaseException, like KeyboardInterrupt, so the readers' `except Exception`
+    fallbacks let it through instead of turning it into an error message.
+    """
+
+
+class AnalysisWorker:
+    """Runs analyze(progress) on a daemon thread and reports back on the Tk main thread.
+
+    analyze does the slow part - reading the PDF, extracting metrics - and must
+    not touch widgets. It calls progress(done, total) as it goes (total may be
+    None if unknown); after cancel() that call raises Cancelled, so the
+    analysis stops at its next page. Messages travel back over a queue that
+    the main thread drains every poll_ms with root.after, and the callbacks -
+    on_progress(done, total), on_done(result), on_error(exception),
+    on_cancel() - all run there. Progress reports that pile up between polls
+    are coalesced into the latest one.
+
+    A thread is enough: the page parsing is spread over a process pool for
+    large documents, and the GIL is released often enough for the window to
+    keep redrawing.
+    """
+
+    def __init__(self, root, analyze, on_progress=None, on_done=None, on_error=None, on_cancel=None,
+                 poll_ms=POLL_MS):
+        self.root = root
+        self.analyze = analyze
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.poll_ms = poll_ms
+        self.finished = False
+        self._messages = queue.Queue()
+        self._cancelled = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, name='report-analysis', daemon=True).start()
+        self.root.after(self.poll_ms, self._poll)
+        return self
+
+    def cancel(self):
+        """Ask the analysis to stop; on_cancel runs once it has"""
+        self._cancelled.set()
+
+    @property
+    def running(self):
+        return not self.finished
+
+    def _progress(self, done, total=None):
+        if self._cancelled.is_set():
+            raise Cancelled()
+        self._messages.put(('progress', (done, total)))
+
+    def _run(self):
+        try:
+            result = self.analyze(self._progress)
+        except Cancelled:
+            self._messages.put(('cancelled', ()))
+        except Exception as e:
+            self._messages.put(('error', (e,)))
+        else:
+            self._messages.put(('cancelled', ()) if self._cancelled.is_set() else ('done', (result,)))
+
+    def _poll(self):
+        progress = None
+        final = None
+        while final is None:
+            try:
+                kind, args = self._messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                progress = args
+            else:
+                final = (kind, args)
+
+        if progress and self.on_progress:
+            self.on_progress(*progress)
+        if final is None:
+            self.root.after(self.poll_ms, self._poll)
+            return
+
+        self.finished = True
+        kind, args = final
+        callback = {'done': self.on_done, 'error': self.on_error, 'cancelled': self.on_cancel}[kind]
+        if callback:
+            callback(*args)
+
+
+def page_counts(file_path):
+    """(pages in file_path, pages an analysis of it reads at most), or (None, None) if the PDF can't be opened"""
+    try:
+        page_count = count_pages(file_path)
+    except Exception:
+        return None, None
+    return page_count, (page_count if PAGE_BUDGET is None else min(PAGE_BUDGET, page_count))
+
+
+def pages_label(pages_read, page_count):
+    """'40' for a document read to the end, '12 of 40 (partial read)' for one the analysis stopped early in"""
+    if page_count is None or pages_read >= page_count:
+        return str(pages_read)
+    return f"{pages_read} of {page_count} (partial read)"
+
+
+class ProgressPanel(tk.Frame):
+    """A page progress bar with a status line and a Cancel button, shown while an analysis runs"""
+
+    def __init__(self, parent, bg='#34495e', fg='white', length=250):
+        super().__init__(parent, bg=bg)
+        self.label = tk.Label(self, text="", font=('Arial', 9), bg=bg, fg=fg)
+        self.label.pack(fill='x')
+        self.bar = ttk.Progressbar(self, mode='determinate', length=length)
+        self.bar.pack(fill='x', pady=3)
+        self.cancel_btn = tk.Button(self, text="✖ Cancel", font=('Arial', 9),
+                                    bg='#e74c3c', fg='white', padx=8, pady=2)
+        self.cancel_btn.pack()
+
+    def start(self, cancel, **pack):
+        """Show the panel, reset, with the Cancel button calling cancel()"""
+        self.bar.stop()
+        self.bar.config(mode='determinate', value=0, maximum=1)
+        self.label.config(text="Opening document...")
+        self.cancel_btn.config(command=cancel, state='normal')
+        self.pack(**(pack or {'fill': 'x', 'pady': 5}))
+
+    def update_progress(self, done, total):
+        if total:
+            self.bar.config(mode='determinate', maximum=total, value=min(done, total))
+            self.label.config(text=f"Reading page {done} of {total}...")
+        else:
+            if str(self.bar.cget('mode')) != 'indeterminate':
+                self.bar.config(mode='indeterminate')
+                self.bar.start(10)
+            self.label.config(text=f"Reading page {done}...")
+
+    def cancelling(self):
+        self.cancel_btn.config(state='disabled')
+        self.label.config(text="Cancelling...")
+
+    def finish(self):
+        self.bar.stop()
+        self.pack_forget()
@@ -0,0 +1,349 @@
+"""Pipeline stage timings and throughput counters, exposed in Prometheus text format"""
+import atexit
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Set FINANCIAL_ANALYZER_METRICS=0 to stop recording; timers then cost nothing
+METRICS_ENABLED = os.environ.get('FINANCIAL_ANALYZER_METRICS', '1') != '0'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# A directory shared by the server's worker processes (serve.py sets one up). Each writes its values
+# there every METRICS_SNAPSHOT_SECONDS, and rendering on any of them adds up every process's
+METRICS_DIR = os.environ.get('FINANCIAL_ANALYZER_METRICS_DIR') or None
+METRICS_SNAPSHOT_SECONDS = float(os.environ.get('FINANCIAL_ANALYZER_METRICS_SNAPSHOT_SECONDS', 5))
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+THROUGHPUT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    'financial_analyzer_stage_seconds': ('histogram', 'Time spent in each analysis stage', LATENCY_BUCKETS),
+    'financial_analyzer_pages_per_second': ('histogram', 'PDF pages extracted per second, per document', THROUGHPUT_BUCKETS),
+    'financial_analyzer_documents_total': ('counter', 'Documents analysed', None),
+    'financial_analyzer_pages_total': ('counter', 'PDF pages extracted', None),
+    'financial_analyzer_bytes_total': ('counter', 'Bytes of input documents processed', None),
+    'financial_analyzer_result_cache_hits_total': ('counter', 'Result cache hits, by tier', None),
+    'financial_analyzer_result_cache_misses_total': ('counter', 'Result cache misses', None),
+    'financial_analyzer_job_queue_depth': ('gauge', 'Jobs waiting for a worker', None),
+    'financial_analyzer_queue_wait_seconds': ('histogram', 'Time analyses waited for an admission slot', LATENCY_BUCKETS),
+    'financial_analyzer_rejected_total': ('counter', 'Requests turned away by admission control, by status', None),
+    'financial_analyzer_in_flight': ('gauge', 'Analyses running', None),
+    'financial_analyzer_waiting': ('gauge', 'Analyses waiting for an admission slot', None),
+}
+
+
+class Histogram:
+    """Observation counts per bucket (value <= bound, plus +Inf), with their sum"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def add(self, counts, total, count):
+        """Fold in another histogram's counts, sum and count (same buckets)"""
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, counts)]
+        self.sum += total
+        self.count += count
+
+
+class Registry:
+    """The process's metric values, keyed by metric name and label set.
+
+    With a directory, the values of every process sharing it are rendered:
+    under a preforked server a scrape reaches whichever worker the connection
+    lands on, and one worker's own numbers would be a fraction of the total.
+    Each process writes its values to <directory>/<pid>.json from a
+    background thread every interval seconds (and on exit), and render() adds
+    up all the files - counters and histograms of workers that have since
+    exited included, so totals don't drop when workers are replaced; gauges
+    only of live ones. Other workers' values can be up to interval old.
+
+    collect(callback) registers a function run before each render and
+    snapshot, for gauges read from live state rather than updated as they
+    change. With enabled False every update is ignored, so callers need no
+    check of their own.
+    """
+
+    def __init__(self, metrics=METRICS, directory=None, interval=METRICS_SNAPSHOT_SECONDS, enabled=True):
+        self.metrics = metrics
+        self.enabled = enabled
+        self.directory = directory
+        self.interval = interval
+        self._values = {name: {} for name in metrics}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._writer_lock = threading.Lock()
+        self._writer_pid = None
+        if directory:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                print(f"Metrics directory unavailable, reporting this process's metrics only: {e}")
+                self.directory = None
+
+    def collect(self, callback):
+        self._collectors.append(callback)
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values[name]
+            if key not in series:
+                series[key] = Histogram(self.metrics[name][2])
+            series[key].observe(value)
+        self._start_writer()
+
+    def increment(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values[name]
+            series[key] = series.get(key, 0) + amount
+        self._start_writer()
+
+    def set(self, name, value, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._values[name][tuple(sorted(labels.items()))] = value
+        self._start_writer()
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        for callback in self._collectors:
+            callback()
+        if self.directory:
+            self._write_snapshot()
+            return _render(self.metrics, self._merged())
+        with self._lock:
+            return _render(self.metrics, self._values)
+
+    def _start_writer(self):
+        """Start this process's snapshot thread, once per process: forked workers don't inherit threads"""
+        if not self.directory or self._writer_pid == os.getpid():
+            return
+        with self._writer_lock:
+            if self._writer_pid == os.getpid():
+                return
+            self._writer_pid = os.getpid()
+        threading.Thread(target=self._write_periodically, name='metrics-snapshot', daemon=True).start()
+        atexit.register(self.write_snapshot)
+
+    def _write_periodically(self):
+        while True:
+            time.sleep(self.interval)
+            self.write_snapshot()
+
+    def write_snapshot(self):
+        """Write this process's values where the other processes sharing the directory read them"""
+        for callback in self._collectors:
+            callback()
+        self._write_snapshot()
+
+    def _write_snapshot(self):
+        with self._lock:
+            snapshot = {name: [[list(key), [value.counts, value.sum, value.count]
+                                if isinstance(value, Histogram) else value]
+                               for key, value in series.items()]
+                        for name, series in self._values.items()}
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, os.path.join(self.directory, f'{os.getpid()}.json'))
+        except OSError:
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _merged(self):
+        """Every process's snapshot added up, in the shape of _values"""
+        merged = {name: {} for name in self.metrics}
+        for entry in os.scandir(self.directory):
+            name, ext = os.path.splitext(entry.name)
+            if ext != '.json' or not name.isdigit():
+                continue
+            try:
+                with open(entry.path, encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = _process_alive(int(name))
+            for metric, series in snapshot.items():
+                if metric not in self.metrics:
+                    continue
+                kind, _, buckets = self.metrics[metric]
+                if kind == 'gauge' and not alive:
+                    continue
+                values = merged[metric]
+                for key, value in series:
+                    key = tuple(tuple(pair) for pair in key)
+                    if kind == 'histogram':
+                        values.setdefault(key, Histogram(buckets)).add(*value)
+                    else:
+                        values[key] = values.get(key, 0) + value
+        return merged
+
+
+def _render(metrics, values):
+    out = io.StringIO()
+    for name, (kind, help_text, _) in metrics.items():
+        series = values[name]
+        if not series:
+            continue
+        out.write(f'# HELP {name} {help_text}\n# TYPE {name} {kind}\n')
+        for key, value in sorted(series.items()):
+            if kind != 'histogram':
+                out.write(f'{name}{_labels(key)} {_number(value)}\n')
+                continue
+            cumulative = 0
+            for bound, count in zip(value.buckets + ('+Inf',), value.counts):
+                cumulative += count
+                out.write(f'{name}_bucket{_labels(key + (("le", _number(bound)),))} {cumulative}\n')
+            out.write(f'{name}_sum{_labels(key)} {_number(value.sum)}\n')
+            out.write(f'{name}_count{_labels(key)} {value.count}\n')
+    return out.getvalue()
+
+
+def _process_alive(pid):
+    if os.name == 'nt':
+        # os.kill() would terminate it; the shared directory is for serve.py's workers, which don't run here
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def _labels(key):
+    if not key:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in key)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(key, escaped)) + '}'
+
+
+def _number(value):
+    if isinstance(value, str):
+        return value
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+registry = Registry(directory=METRICS_DIR, enabled=METRICS_ENABLED)
+
+
+@contextmanager
+def stage(name):
+    """Record the time spent in the with block as one run of stage name"""
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe('financial_analyzer_stage_seconds', time.perf_counter() - start, stage=name)
+
+
+class StageTimer:
+    """Time for one stage that is spread over many short spans, recorded as a single run.
+
+    Page-by-page reading interleaves PDF parsing with metric matching; wrap the
+    page iterator with iterate() and time each match with the timer as a context
+    manager (read_pages() takes it as feed_timer), then call record() once the
+    document is done.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed += time.perf_counter() - self._start
+
+    def iterate(self, iterable):
+        """iterable, timing each step; closing the result closes iterable"""
+        if not METRICS_ENABLED:
+            return iterable
+        return self._timed_iter(iter(iterable))
+
+    def _timed_iter(self, iterator):
+        try:
+            while True:
+                with self:
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                yield item
+        finally:
+            if hasattr(iterator, 'close'):
+                iterator.close()
+
+    def record(self):
+        if METRICS_ENABLED:
+            registry.observe('financial_analyzer_stage_seconds', self.elapsed, stage=self.name)
+
+
+def record_document(source, pages, extract_seconds):
+    """Count one analysed document: its size, its pages and how fast they were extracted"""
+    if not METRICS_ENABLED:
+        return
+    registry.increment('financial_analyzer_documents_total')
+    registry.increment('financial_analyzer_pages_total', pages)
+    size = source_size(source)
+    if size is not None:
+        registry.increment('financial_analyzer_bytes_total', size)
+    if pages and extract_seconds > 0:
+        registry.observe('financial_analyzer_pages_per_second', pages / extract_seconds)
+
+
+def source_size(source):
+    """Size in bytes of a path, bytes or seekable file object; None if it can't be told"""
+    try:
+        if isinstance(source, (str, os.PathLike)):
+            return os.path.getsize(source)
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return len(source)
+        position = source.tell()
+        size = source.seek(0, os.SEEK_END)
+        source.seek(position)
+        return size
+    except (OSError, AttributeError, ValueError):
+        return None
+
+
+def write_textfile(path):
+    """Write the metrics to path atomically, for the node_exporter textfile collector"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(registry.render())
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
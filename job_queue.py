@@ -0,0 +1,197 @@
+"""In-process job queue: a bounded backlog of jobs run by a pool of worker threads"""
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+
+from job_store import POLL_INTERVAL
+
+# Worker threads, queued jobs allowed before submit() refuses, and how long finished jobs are kept
+JOB_WORKERS = int(os.environ.get('FINANCIAL_ANALYZER_JOB_WORKERS', 2))
+JOB_QUEUE_DEPTH = int(os.environ.get('FINANCIAL_ANALYZER_JOB_QUEUE', 16))
+JOB_TTL = int(os.environ.get('FINANCIAL_ANALYZER_JOB_TTL', 3600))
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when the backlog is at max_queued"""
+
+
+class JobQueue:
+    """Runs handler(*args, progress=callback) for each submitted job on worker threads.
+
+    Jobs are dicts with an id, a status ('queued', 'running', 'done' or
+    'failed'), timestamps, the latest progress report and the handler's result
+    or error. The handler reports progress by calling progress(stage, **fields).
+    Workers start with the first submit; finished jobs are forgotten after ttl
+    seconds. Everything lives in this process - no broker is needed.
+
+    Each job also keeps an event log - (name, data) pairs for every status
+    change and progress report - which events() lets a client follow live.
+
+    With a store (a job_store.JobStore), every change is also written there,
+    and get() and events() fall back to it for jobs run by another process -
+    so any worker of a multi-process server can answer for any job.
+
+    With an admission controller (admission.AdmissionController), a job takes
+    one of its slots before it starts, so jobs share the cap on concurrent
+    analyses with the rest of the server; until then it stays queued. Finished
+    jobs report wait_seconds (submit to start) and run_seconds separately.
+    """
+
+    def __init__(self, handler, workers=JOB_WORKERS, max_queued=JOB_QUEUE_DEPTH, ttl=JOB_TTL, store=None,
+                 admission=None):
+        self.handler = handler
+        self.store = store
+        self.admission = admission
+        self.workers = max(1, workers)
+        self.ttl = ttl
+        self._queue = queue.Queue(maxsize=max(1, max_queued))
+        self._jobs = {}
+        self._events = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._threads = []
+
+    def submit(self, *args, cleanup=None):
+        """Queue a job and return its id; cleanup() runs once the job has finished or been refused"""
+        self._start()
+        self._expire()
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'status': 'queued',
+            'submitted': time.time(),
+            'started': None,
+            'finished': None,
+            'wait_seconds': None,
+            'run_seconds': None,
+            'progress': None,
+        }
+        queued = ('queued', {'position': self._queue.qsize() + 1})
+        with self._lock:
+            self._jobs[job_id] = job
+            self._events[job_id] = [queued]
+            if self.store:
+                self.store.save(job, queued, 0)
+        try:
+            self._queue.put_nowait((job, args, cleanup))
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job_id]
+                del self._events[job_id]
+                if self.store:
+                    self.store.delete(job_id)
+            if cleanup:
+                cleanup()
+            raise QueueFull(f"{self._queue.maxsize} jobs already queued")
+        return job_id
+
+    def get(self, job_id):
+        """A snapshot of the job, or None if it is unknown or has expired"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return dict(job)
+        return self.store.load(job_id) if self.store else None
+
+    def events(self, job_id, after=0, timeout=None):
+        """Wait up to timeout seconds for events past the first `after`.
+
+        Returns (events, finished): the new (name, data) pairs, and whether the
+        job has ended (or is unknown) so no more will follow.
+        """
+        with self._changed:
+            local = job_id in self._jobs
+            if local or not self.store:
+                def ready():
+                    job = self._jobs.get(job_id)
+                    return job is None or job['finished'] or len(self._events[job_id]) > after
+
+                self._changed.wait_for(ready, timeout)
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return [], True
+                return self._events[job_id][after:], bool(job['finished'])
+        return self._stored_events(job_id, after, timeout)
+
+    def _stored_events(self, job_id, after, timeout):
+        """events() for a job run by another process: poll the store until something happens"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            found = self.store.events(job_id, after)
+            if found is None:
+                return [], True
+            if found[0] or found[1]:
+                return found
+            if deadline is not None and time.monotonic() >= deadline:
+                return found
+            time.sleep(POLL_INTERVAL if deadline is None else
+                       max(0, min(POLL_INTERVAL, deadline - time.monotonic())))
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def full(self):
+        """True if submit() would be refused right now"""
+        return self._queue.full()
+
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items()
+                           if job['finished'] and job['finished'] < cutoff]:
+                del self._jobs[job_id]
+                del self._events[job_id]
+        if self.store:
+            self.store.expire(cutoff)
+
+    def _update(self, job, event=None, **fields):
+        """Update a job, log event (a (name, data) pair) if given, and wake anyone following it"""
+        with self._changed:
+            job.update(fields)
+            if event:
+                self._events[job['id']].append(event)
+            if self.store:
+                self.store.save(job, event, len(self._events[job['id']]) - 1)
+            self._changed.notify_all()
+
+    def _work(self):
+        while True:
+            job, args, cleanup = self._queue.get()
+            try:
+                # The job was accepted when it was queued, so it waits for a slot however long the line
+                with self.admission.slot(reject=False, queue='jobs') if self.admission else nullcontext():
+                    self._run(job, args)
+            finally:
+                if cleanup:
+                    cleanup()
+                self._queue.task_done()
+
+    def _run(self, job, args):
+        started = time.time()
+        self._update(job, status='running', started=started, wait_seconds=started - job['submitted'],
+                     event=('running', {}))
+
+        def progress(stage, **fields):
+            self._update(job, progress=dict(fields, stage=stage), event=(stage, fields))
+
+        try:
+            result = self.handler(*args, progress=progress)
+            finished = time.time()
+            self._update(job, status='done', result=result, finished=finished, run_seconds=finished - started,
+                         event=('done', result))
+        except Exception as e:
+            finished = time.time()
+            self._update(job, status='failed', error=str(e), finished=finished, run_seconds=finished - started,
+                         event=('failed', {'error': str(e)}))
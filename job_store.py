@@ -0,0 +1,90 @@
+"""Job state shared between server processes through a SQLite file"""
+import json
+import os
+import sqlite3
+import threading
+
+# Shared job database; "" (the default) keeps jobs in the process that ran them.
+# serve.py sets it when running more than one worker process.
+JOB_DB_PATH = os.environ.get('FINANCIAL_ANALYZER_JOB_DB', '')
+# How often a process following another process's job checks for new events
+POLL_INTERVAL = 0.25
+
+
+class JobStore:
+    """A copy of JobQueue's jobs and event logs that every process can read.
+
+    The JobQueue that runs a job writes each change through save(); any other
+    process answers status and event requests for it with load() and events().
+    Connections are opened per process on first use, so a store created before
+    the server forks its workers is safe to use in each of them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _connection(self):
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS jobs '
+                             '(id TEXT PRIMARY KEY, job TEXT NOT NULL, finished REAL)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS events (job_id TEXT NOT NULL, position INTEGER NOT NULL, '
+                             'name TEXT NOT NULL, data TEXT NOT NULL, PRIMARY KEY (job_id, position))')
+            self._pid = os.getpid()
+        return self._db
+
+    def save(self, job, event=None, position=None):
+        """Store job's current state and, if given, its event at position in the log"""
+        with self._lock:
+            db = self._connection()
+            with db:
+                db.execute('BEGIN')
+                db.execute('INSERT OR REPLACE INTO jobs (id, job, finished) VALUES (?, ?, ?)',
+                           (job['id'], json.dumps(job), job['finished']))
+                if event:
+                    db.execute('INSERT OR REPLACE INTO events (job_id, position, name, data) VALUES (?, ?, ?, ?)',
+                               (job['id'], position, event[0], json.dumps(event[1])))
+
+    def load(self, job_id):
+        with self._lock:
+            row = self._connection().execute('SELECT job FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def events(self, job_id, after=0):
+        """(events, finished) as JobQueue.events() gives them, without waiting; None if job_id is unknown"""
+        with self._lock:
+            db = self._connection()
+            row = db.execute('SELECT finished FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None:
+                return None
+            rows = db.execute('SELECT name, data FROM events WHERE job_id = ? AND position >= ? ORDER BY position',
+                              (job_id, after)).fetchall()
+        return [(name, json.loads(data)) for name, data in rows], row[0] is not None
+
+    def delete(self, job_id):
+        with self._lock:
+            db = self._connection()
+            with db:
+                db.execute('BEGIN')
+                db.execute('DELETE FROM events WHERE job_id = ?', (job_id,))
+                db.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+
+    def expire(self, cutoff):
+        """Forget jobs that finished before cutoff (a time.time() value)"""
+        with self._lock:
+            db = self._connection()
+            with db:
+                db.execute('BEGIN')
+                db.execute('DELETE FROM events WHERE job_id IN (SELECT id FROM jobs WHERE finished < ?)', (cutoff,))
+                db.execute('DELETE FROM jobs WHERE finished < ?', (cutoff,))
+
+
+def job_store():
+    """A JobStore on JOB_DB_PATH, or None when jobs aren't shared"""
+    return JobStore(JOB_DB_PATH) if JOB_DB_PATH else None
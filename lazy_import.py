@@ -0,0 +1,41 @@
+"""Deferred imports, so heavy dependencies load on first use rather than at startup"""
+import importlib
+import threading
+
+_lock = threading.RLock()
+
+
+class LazyModule:
+    """Stands in for a module and imports it the first time one of its attributes is used.
+
+    on_import(module), if given, runs once right after the import - for setup
+    such as choosing a matplotlib backend. A missing package raises its
+    ImportError at that first use instead of when the program starts.
+    """
+
+    def __init__(self, name, on_import=None):
+        self._name = name
+        self._on_import = on_import
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            with _lock:
+                if self._module is None:
+                    module = importlib.import_module(self._name)
+                    if self._on_import:
+                        self._on_import(module)
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name, on_import=None):
+    """A LazyModule for name: `np = lazy_import('numpy')` instead of `import numpy as np`"""
+    return LazyModule(name, on_import)
@@ -0,0 +1,208 @@
+"""Metric pattern registry shared by every front end, compiled once at import time.
+
+PATTERN_TABLES keeps one profile per front end rather than a single merged
+table. Each profile is the pattern set its front end already used, and they
+differ in which metrics and labels count and how far a figure may be from
+its label:
+
+  web       four metrics, 'revenue'/'sales' style labels, figure on the label's line
+  cli       as web plus EBITDA; a '$' and whitespace may lead the figure, even onto the next line
+  gui       extra labels ('total revenue', 'net earnings', 'gross profit'), and a
+            figure up to 200 characters after the label, across lines
+  enhanced  eight metrics, including expenses, liabilities and equity, with bare
+            labels ('assets' where others want 'total assets')
+  pro       the enhanced metrics up to EBITDA
+  ai        regex lists with their own figure format and units, matched against
+            lowercased text
+
+Merging them would change the figures each front end reports for the same
+document (for the web app, an ANALYSIS_VERSION bump that drops every cached
+result), so the differences stay - listed here, in one place, where they can
+be compared and brought together front end by front end, deliberately.
+"""
+import re
+
+from metric_scanner import AnchoredScanner
+
+# Figure formats: grouped thousands with optional cents, or the AI analyzer's looser digit runs
+AMOUNT = r'(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'
+FIGURE = r'(\d+(?:[,\.]\d+)*)'
+# Label, then optional colon and '$' and the figure: what \s*:?\s*[\$]?\s* accepts, but the
+# whitespace runs can't be split between adjacent \s* (cubic in a long blank run with no figure)
+LABELLED_FIGURE = r'\s*(?::\s*)?(?:\$\s*)?' + FIGURE
+# Up to three words between the parts of a multi-word label ('property, plant and equipment'), on
+# one line as with the .* chains these replace; words and separators alternate, so only one way matches
+WORD_GAP = r'[^\w\n]+(?:\w+[^\w\n]+){0,3}?'
+
+
+def _words(*parts):
+    return WORD_GAP.join(parts)
+
+
+def _same_line(*labels, currency=True):
+    """Label, then the nearest figure on the same line (label.*?[\$]?\s*amount)"""
+    return AnchoredScanner(labels, AMOUNT, currency=currency)
+
+
+def _nearby(*labels):
+    """Label, then the nearest figure within 200 characters (label[\s\S]{0,200}?[\$]?\s*amount)"""
+    return AnchoredScanner(labels, AMOUNT, window=200)
+
+
+# Per front end: metric -> an AnchoredScanner over labels in priority order, or a
+# list of regexes in priority order, each capturing the figure in its only group
+PATTERN_TABLES = {
+    'web': {
+        'revenue': _same_line('revenue', 'sales', currency=False),
+        'net_income': _same_line('net income', 'net profit', currency=False),
+        'assets': _same_line('total assets', currency=False),
+        'profit': _same_line('profit', currency=False),
+    },
+    'cli': {
+        'revenue': _same_line('revenue', 'sales'),
+        'net_income': _same_line('net income', 'net profit'),
+        'assets': _same_line('total assets'),
+        'profit': _same_line('profit'),
+        'ebitda': _same_line('ebitda'),
+    },
+    'gui': {
+        'revenue': _nearby('revenue', 'sales', 'total revenue'),
+        'net_income': _nearby('net income', 'net profit', 'net earnings'),
+        'assets': _nearby('total assets', 'assets'),
+        'profit': _nearby('profit', 'gross profit'),
+        'ebitda': _nearby('ebitda'),
+    },
+    'enhanced': {
+        'revenue': _same_line('revenue'),
+        'net_income': _same_line('net income'),
+        'assets': _same_line('assets'),
+        'profit': _same_line('profit'),
+        'ebitda': _same_line('ebitda'),
+        'expenses': _same_line('expenses'),
+        'liabilities': _same_line('liabilities'),
+        'equity': _same_line('equity'),
+    },
+    'pro': {
+        'revenue': _same_line('revenue'),
+        'net_income': _same_line('net income'),
+        'assets': _same_line('assets'),
+        'profit': _same_line('profit'),
+        'ebitda': _same_line('ebitda'),
+    },
+    # Matched case-sensitively against lowercased text
+    'ai': {
+        'revenue': [
+            r'revenue' + LABELLED_FIGURE + r'\s*(?:million|billion|thousand|M|B|K)?',
+            r'total\s+revenue' + LABELLED_FIGURE,
+            r'sales' + LABELLED_FIGURE,
+            r'revenue\s+[\$]' + FIGURE,
+            r'income\s+from\s+operations' + LABELLED_FIGURE
+        ],
+        'net_income': [
+            r'net\s+income' + LABELLED_FIGURE,
+            r'net\s+profit' + LABELLED_FIGURE,
+            r'net\s+earnings' + LABELLED_FIGURE,
+            r'profit\s+after\s+tax' + LABELLED_FIGURE,
+            r'net\s+[\$]' + FIGURE
+        ],
+        'assets': [
+            r'total\s+assets' + LABELLED_FIGURE,
+            r'assets' + LABELLED_FIGURE,
+            r'total\s+assets\s+[\$]' + FIGURE,
+            _words('property', 'equipment') + LABELLED_FIGURE
+        ],
+        'profit': [
+            r'gross\s+profit' + LABELLED_FIGURE,
+            r'operating\s+profit' + LABELLED_FIGURE,
+            r'profit\s+before\s+tax' + LABELLED_FIGURE,
+            r'gross\s+[\$]' + FIGURE
+        ],
+        'ebitda': [
+            r'ebitda' + LABELLED_FIGURE,
+            _words('earnings', 'before', 'interest', r'tax\w*', 'depreciation', 'amortization') + LABELLED_FIGURE
+        ],
+        'liabilities': [
+            r'total\s+liabilities' + LABELLED_FIGURE,
+            r'liabilities' + LABELLED_FIGURE,
+            r'debt' + LABELLED_FIGURE
+        ],
+        'equity': [
+            r'total\s+equity' + LABELLED_FIGURE,
+            r'equity' + LABELLED_FIGURE,
+            r'shareholders\'\s+equity' + LABELLED_FIGURE
+        ]
+    },
+}
+
+PROFILE_FLAGS = {'ai': 0}
+
+# The capturing group of a pattern: an unescaped '(' not followed by '?'
+_CAPTURE_GROUP = re.compile(r'(?<!\\)\((?!\?)')
+
+
+class MetricPattern:
+    """One metric's patterns, compiled into a single alternation.
+
+    Alternative i is wrapped in a lookahead and captures its figure in group
+    'p<i>', so one finditer pass visits every position where any pattern
+    matches, and reports the highest-priority pattern matching there.
+    """
+
+    def __init__(self, patterns, flags=re.IGNORECASE):
+        self.patterns = tuple(patterns)
+        self.compiled = tuple(re.compile(pattern, flags) for pattern in self.patterns)
+        self.combined = re.compile('|'.join(
+            '(?=' + _CAPTURE_GROUP.sub(f'(?P<p{i}>', pattern, count=1) + ')'
+            for i, pattern in enumerate(self.patterns)), flags)
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def search(self, text, parse, limit=None, spent=None):
+        """Return (priority, value, span) for the best pattern in text, or None.
+
+        Same answer as trying each pattern in priority order and taking the
+        first whose first match parses, but in one pass over text. Only
+        priorities below limit are considered; spent is a set of priorities
+        whose first match has already been seen (later matches of a spent
+        pattern never count), and is updated in place. span is the (start,
+        end) of the figure in text.
+        """
+        limit = len(self.patterns) if limit is None else limit
+        spent = set() if spent is None else spent
+        best = None
+        for hit in self.combined.finditer(text):
+            position = hit.start()
+            reported = int(hit.lastgroup[1:])
+            # Lower-priority patterns may match at the same position; the
+            # alternation only reports the first, so check the rest directly
+            for priority in range(reported, limit):
+                if priority in spent:
+                    continue
+                if priority == reported:
+                    span = hit.span(hit.lastgroup)
+                else:
+                    match = self.compiled[priority].match(text, position)
+                    if not match:
+                        continue
+                    span = match.span(1)
+                spent.add(priority)
+                value = parse(text[span[0]:span[1]])
+                if value is not None:
+                    best = (priority, value, span)
+                    limit = priority
+                    break
+            if limit == 0:
+                break
+        return best
+
+
+def _compiled(patterns, flags):
+    return patterns if isinstance(patterns, AnchoredScanner) else MetricPattern(patterns, flags)
+
+
+METRIC_PATTERNS = {
+    profile: {metric: _compiled(patterns, PROFILE_FLAGS.get(profile, re.IGNORECASE))
+              for metric, patterns in table.items()}
+    for profile, table in PATTERN_TABLES.items()
+}
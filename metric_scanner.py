@@ -0,0 +1,121 @@
+"""Linear-time 'label, then nearest figure' scanner for the label.*?figure metric patterns"""
+import re
+
+_DIGIT = re.compile(r'\d')
+_NEWLINE = re.compile(r'\n')
+
+
+class AnchoredScanner:
+    """Finds the same figures as label.*?figure / label[\\s\\S]{0,window}?figure regexes.
+
+    Those patterns retry the lazy gap from every label occurrence, so a long
+    number-free stretch full of labels costs quadratic time. This scanner finds
+    label anchors with one alternation pass and then the nearest digit after
+    each anchor with searches that only ever move forward, so a whole scan is
+    linear in the text. It has MetricPattern's interface: labels are the
+    patterns in priority order, and search() gives the same answer.
+
+    window None means the figure must start on the label's line (.*?), an int
+    means within that many characters of the label ([\\s\\S]{0,window}?). With
+    currency set the figure may be preceded by '$' and whitespace
+    ([\\$]?\\s*), which lets it sit on a following line.
+    """
+
+    def __init__(self, labels, figure, window=None, currency=True, flags=re.IGNORECASE):
+        self.labels = tuple(labels)
+        self.window = window
+        self.currency = currency
+        self.figure = re.compile(figure, flags)
+        self.compiled = tuple(re.compile(label, flags) for label in self.labels)
+        self.anchors = re.compile('|'.join(
+            f'(?=(?P<p{i}>{label}))' for i, label in enumerate(self.labels)), flags)
+        gap = r'.*?' if window is None else r'[\s\S]{0,%d}?' % window
+        lead = r'[\$]?\s*' if currency else ''
+        self.patterns = tuple(label + gap + lead + figure for label in self.labels)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def search(self, text, parse, limit=None, spent=None):
+        """Return (priority, value, span) for the best label in text, or None (see MetricPattern.search)"""
+        limit = len(self.labels) if limit is None else limit
+        spent = set() if spent is None else spent
+        finder = _FigureFinder(text, self)
+        best = None
+        for hit in self.anchors.finditer(text):
+            position = hit.start()
+            reported = int(hit.lastgroup[1:])
+            for priority in range(reported, limit):
+                if priority in spent:
+                    continue
+                if priority == reported:
+                    end = hit.end(hit.lastgroup)
+                else:
+                    match = self.compiled[priority].match(text, position)
+                    if not match:
+                        continue
+                    end = match.end()
+                span = finder.figure_after(end)
+                if span is None:
+                    continue
+                spent.add(priority)
+                value = parse(text[span[0]:span[1]])
+                if value is not None:
+                    best = (priority, value, span)
+                    limit = priority
+                    break
+            if limit == 0:
+                break
+        return best
+
+
+class _FigureFinder:
+    """Nearest-figure lookups over one text for one scan.
+
+    Anchors arrive in increasing order, so the next digit and next newline are
+    cached and only searched for again once an anchor has passed them.
+    """
+
+    def __init__(self, text, scanner):
+        self.text = text
+        self.scanner = scanner
+        self._next = {_DIGIT: (0, -1), _NEWLINE: (0, -1)}
+        self._gap_start = (-1, 0)
+
+    def _next_match(self, regex, position):
+        searched_from, found = self._next[regex]
+        if found < position or searched_from > position:
+            match = regex.search(self.text, position)
+            found = match.start() if match else len(self.text)
+            self._next[regex] = (position, found)
+        return found
+
+    def _lead_start(self, digit):
+        """Start of the '$'-then-whitespace run that ends at digit"""
+        if self._gap_start[0] != digit:
+            text = self.text
+            start = digit
+            while start > 0 and text[start - 1].isspace():
+                start -= 1
+            if start > 0 and text[start - 1] == '$':
+                start -= 1
+            self._gap_start = (digit, start)
+        return self._gap_start[1]
+
+    def figure_after(self, end):
+        """Span of the figure the regex would capture for a label ending at end, or None"""
+        scanner = self.scanner
+        digit = self._next_match(_DIGIT, end)
+        if digit == len(self.text):
+            return None
+        if scanner.window is None:
+            # The lazy gap stops at the line end; only the lead can cross it
+            line_end = self._next_match(_NEWLINE, end)
+            reachable = digit < line_end or (scanner.currency and self._lead_start(digit) <= line_end)
+        else:
+            gap_end = end + scanner.window
+            reachable = digit <= gap_end or (scanner.currency and self._lead_start(digit) <= gap_end)
+        if not reachable:
+            return None
+        match = scanner.figure.match(self.text, digit)
+        return match.span(1) if match else None
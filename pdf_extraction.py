@@ -0,0 +1,469 @@
+"""PDF text extraction shared by the web app, the CLI and the Tk front ends"""
+import io
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+
+from disk_cache import DiskCache, sha256_of
+from lazy_import import lazy_import
+
+PyPDF2 = lazy_import('PyPDF2')
+# Slow to import, and only needed once the page cache is looked up (for its key)
+metadata = lazy_import('importlib.metadata')
+
+# Documents shorter than this are parsed serially - starting workers costs more than it saves
+PARALLEL_MIN_PAGES = 24
+# Split the document into several ranges per worker so a slow range doesn't stall the pool
+CHUNKS_PER_WORKER = 4
+MIN_CHUNK_PAGES = 4
+
+
+def _env_int(name, default):
+    """Integer setting from the environment; a malformed value falls back to default"""
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+# Page budget for streaming analysis (FINANCIAL_ANALYZER_PAGE_BUDGET); None reads the whole document
+PAGE_BUDGET = _env_int('FINANCIAL_ANALYZER_PAGE_BUDGET', 0) or None
+
+# Extracted page text is cached by the SHA-256 of the PDF bytes; set the directory to "" to disable
+CACHE_DIR = os.environ.get('FINANCIAL_ANALYZER_CACHE_DIR',
+                           os.path.join(os.path.expanduser('~'), '.cache', 'financial_analyzer'))
+CACHE_MAX_BYTES = _env_int('FINANCIAL_ANALYZER_CACHE_MB', 256) * 1024 * 1024
+CACHE_SUFFIX = '.pages.z'
+# Bump when what gets stored for a page changes; the PyPDF2 version is part of the key as well
+PAGE_FORMAT_VERSION = 1
+
+# PDFs open_document() keeps open between uses, e.g. from a GUI's file check to its analysis
+OPEN_DOCUMENTS = 4
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def default_workers():
+    """Worker count from FINANCIAL_ANALYZER_WORKERS, or one per CPU"""
+    workers = _env_int('FINANCIAL_ANALYZER_WORKERS', 0)
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def get_pool(workers):
+    """Return the shared extraction pool, recreating it if the worker count changed"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+
+def page_cache():
+    """The shared page-text cache, or None when caching is disabled or its directory can't be created"""
+    global _page_cache
+    if not CACHE_DIR:
+        return None
+    with _page_cache_lock:
+        if _page_cache is None:
+            try:
+                _page_cache = DiskCache(CACHE_DIR, CACHE_MAX_BYTES, suffix=CACHE_SUFFIX)
+            except OSError as e:
+                print(f"Page cache directory unavailable, extracting without a cache: {e}")
+                _page_cache = False
+        return _page_cache or None
+
+
+@lru_cache(maxsize=None)
+def _extractor_version():
+    # From the package metadata, so a cache hit doesn't import PyPDF2
+    try:
+        pypdf2 = metadata.version('PyPDF2')
+    except metadata.PackageNotFoundError:
+        pypdf2 = PyPDF2.__version__
+    return f'{PAGE_FORMAT_VERSION}-pypdf2-{pypdf2}'
+
+
+def page_key(digest, partial=False):
+    """Cache key for the pages of the PDF with SHA-256 digest, as extracted by this code and PyPDF2.
+
+    With partial set, the key of the entry holding just the first pages, as far
+    as reads that stopped early (metrics settled, page budget) have got.
+    """
+    key = f'{digest}-{_extractor_version()}'
+    return key + '-partial' if partial else key
+
+
+def load_cached_pages(cache, digest, partial=False):
+    data = cache.get(page_key(digest, partial))
+    if data is None:
+        return None
+    try:
+        return json.loads(zlib.decompress(data).decode('utf-8'))
+    except (zlib.error, ValueError):
+        return None
+
+
+def store_cached_pages(cache, digest, pages, partial=False):
+    cache.put(page_key(digest, partial), zlib.compress(json.dumps(pages).encode('utf-8')))
+
+
+def _store_read_pages(cache, digest, pages, total_pages, stored):
+    """Save the first pages of a document once a read is done with them: as the full entry if
+    that's all of them, else as the partial entry if they go further than the stored pages did"""
+    if len(pages) == total_pages:
+        store_cached_pages(cache, digest, pages)
+    elif len(pages) > stored:
+        store_cached_pages(cache, digest, pages, partial=True)
+
+
+def _extract_page(page):
+    try:
+        return page.extract_text() or ""
+    except Exception:
+        return ""
+
+
+@contextmanager
+def open_pdf(path):
+    """Open a PDF for PdfReader as a read-only memory map.
+
+    PdfReader(path) reads the whole file into a BytesIO; a map lets it seek
+    around a file of any size while the OS pages in only what is touched.
+    """
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files (and filesystems without mmap) are read as a plain file
+            mapped = None
+        if mapped is None:
+            yield f
+        else:
+            with mapped:
+                yield mapped
+
+
+def _extract_range(path, start, stop):
+    """Pool task: extract pages [start, stop) of the PDF at path"""
+    with open_pdf(path) as stream:
+        reader = PyPDF2.PdfReader(stream)
+        return [_extract_page(reader.pages[i]) for i in range(start, stop)]
+
+
+def page_ranges(total_pages, workers):
+    """Split total_pages into contiguous (start, stop) ranges for the pool"""
+    chunk = max(MIN_CHUNK_PAGES, -(-total_pages // (workers * CHUNKS_PER_WORKER)))
+    return [(start, min(start + chunk, total_pages)) for start in range(0, total_pages, chunk)]
+
+
+@contextmanager
+def _spooled(stream):
+    """Copy a file object to a temporary PDF so pool workers can open it by path"""
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as spool:
+            stream.seek(0)
+            shutil.copyfileobj(stream, spool)
+        yield path
+    finally:
+        os.unlink(path)
+
+
+def extract_pages(source, workers=None, cache=True):
+    """Return the text of every page of a PDF, in page order.
+
+    source may be a path, raw bytes or a binary file object. Pages that fail to
+    extract come back as empty strings. Documents with PARALLEL_MIN_PAGES pages
+    or more are split into page ranges and parsed on a process pool.
+
+    Results are looked up in and saved to the page cache (keyed by the SHA-256
+    of the PDF bytes) unless cache is False; pass a DiskCache to use another one.
+    """
+    return list(iter_pages(source, workers=workers, cache=cache))
+
+
+def iter_pages(source, workers=None, cache=True, max_pages=None):
+    """Yield the text of each page of a PDF in order, parsing only as far as it is consumed.
+
+    Takes the same arguments as extract_pages(), plus max_pages to stop after a
+    page budget. Closing the generator early (or breaking out of a for loop over
+    it) stops parsing and cancels any page ranges still queued on the pool. The
+    pages read so far are cached then too, as a partial entry, so the next read
+    of the same document - which usually stops at the same place - parses
+    nothing it has parsed before.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    if cache is True:
+        cache = page_cache()
+
+    digest = None
+    known = []
+    if cache:
+        digest = sha256_of(source)
+        pages = load_cached_pages(cache, digest)
+        if pages is not None:
+            yield from pages[:max_pages]
+            return
+        known = load_cached_pages(cache, digest, partial=True) or []
+        yield from known[:max_pages]
+        if max_pages is not None and len(known) >= max_pages:
+            return
+
+    if isinstance(source, (str, os.PathLike)):
+        with open_pdf(source) as stream:
+            yield from _iter_parsed(stream, os.fspath(source), workers, cache, digest, max_pages, known)
+    else:
+        yield from _iter_parsed(source, None, workers, cache, digest, max_pages, known)
+
+
+def count_pages(path, max_pages=None):
+    """Number of pages iter_pages(path, max_pages=max_pages) yields at most, from the PDF's page tree alone.
+
+    Taken from the open_document() document if the PDF is open there; otherwise
+    the file is opened just for the count, as nothing would reuse a document.
+    """
+    document = _open_document(path)
+    if document is not None:
+        total_pages = document.page_count
+    else:
+        with open_pdf(path) as stream:
+            total_pages = len(PyPDF2.PdfReader(stream).pages)
+    return total_pages if max_pages is None else min(max_pages, total_pages)
+
+
+def _file_stamp(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class PdfDocument:
+    """A PDF kept open between uses, with the text of every page extracted so far.
+
+    open_document() hands back the same one until the file's mtime or size
+    changes, so pages read for a quick look - validating a selected file, say -
+    are not parsed again when the whole document is read.
+
+    close() waits for any iter_pages() still reading the file, and a closed
+    document reopens it for the next iter_pages() (closing it again after), so
+    one dropped from open_document() stays usable wherever it is still held.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.stamp = _file_stamp(path)
+        # A plain file rather than open_pdf()'s map: this stays open indefinitely, and reading a
+        # map of a file truncated meanwhile crashes the process instead of raising
+        self._file = open(path, 'rb')
+        try:
+            self.reader = PyPDF2.PdfReader(self._file)
+            self.page_count = len(self.reader.pages)
+        except BaseException:
+            self._file.close()
+            raise
+        self._pages = {}
+        self._digest = None
+        self._stored = 0  # How many of the first pages the page cache holds
+        self._readers = 0  # iter_pages() generators using the file
+        self._closed = False
+        self._lock = threading.RLock()
+
+    def changed(self):
+        """True if the file has been modified, replaced or removed since it was opened"""
+        try:
+            return _file_stamp(self.path) != self.stamp
+        except OSError:
+            return True
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            if not self._readers:
+                self._file.close()
+
+    def _acquire(self):
+        with self._lock:
+            if self._file.closed:
+                self._file = open(self.path, 'rb')
+                self.reader = PyPDF2.PdfReader(self._file)
+            self._readers += 1
+
+    def _release(self):
+        with self._lock:
+            self._readers -= 1
+            if self._closed and not self._readers:
+                self._file.close()
+
+    def digest(self):
+        if self._digest is None:
+            self._digest = sha256_of(self.path)
+        return self._digest
+
+    def page_text(self, index):
+        """Text of page index (from 0), extracted on first use"""
+        with self._lock:
+            if index not in self._pages:
+                self._pages[index] = _extract_page(self.reader.pages[index])
+            return self._pages[index]
+
+    def iter_pages(self, workers=None, cache=True, max_pages=None):
+        """Yield the text of each page in order, like iter_pages(), extracting only pages not read yet.
+
+        The page cache is consulted and written - the whole document or, after
+        an early stop, the pages read so far - as iter_pages() does; pass
+        cache=False for a quick look that shouldn't hash the file.
+        """
+        limit = self.page_count if max_pages is None else min(max_pages, self.page_count)
+        if cache is True:
+            cache = page_cache()
+        if cache and any(i not in self._pages for i in range(limit)):
+            pages = load_cached_pages(cache, self.digest())
+            if pages is None:
+                pages = load_cached_pages(cache, self.digest(), partial=True) or []
+            with self._lock:
+                self._pages.update(enumerate(pages))
+                self._stored = max(self._stored, len(pages))
+
+        self._acquire()
+        try:
+            next_page = 0
+            while next_page < limit and next_page in self._pages:
+                yield self._pages[next_page]
+                next_page += 1
+
+            workers = workers or default_workers()
+            if workers >= 2 and limit - next_page >= PARALLEL_MIN_PAGES:
+                for chunk in _iter_parallel(self.reader, self._file, self.path, limit, workers, start=next_page):
+                    with self._lock:
+                        self._pages.update(enumerate(chunk, next_page))
+                    for page_text in chunk:
+                        next_page += 1
+                        yield page_text
+            else:
+                for index in range(next_page, limit):
+                    yield self.page_text(index)
+        finally:
+            if cache:
+                self._store(cache)
+            self._release()
+
+    def _store(self, cache):
+        """Cache the first pages read, if that's further than the page cache has them"""
+        with self._lock:
+            read = 0
+            while read in self._pages:
+                read += 1
+            if read > self._stored:
+                _store_read_pages(cache, self.digest(), [self._pages[i] for i in range(read)],
+                                  self.page_count, self._stored)
+                self._stored = read
+
+
+_documents = OrderedDict()
+_documents_lock = threading.Lock()
+
+
+def _open_document(path):
+    """The open_document() document for path if there is an up-to-date one, else None"""
+    with _documents_lock:
+        document = _documents.get(os.path.abspath(os.fspath(path)))
+        return document if document is not None and not document.changed() else None
+
+
+def open_document(path):
+    """The PdfDocument for the PDF at path, reused until the file's mtime or size changes"""
+    path = os.path.abspath(os.fspath(path))
+    with _documents_lock:
+        document = _documents.pop(path, None)
+        if document is not None and document.changed():
+            document.close()
+            document = None
+        if document is None:
+            document = PdfDocument(path)
+        _documents[path] = document
+        while len(_documents) > OPEN_DOCUMENTS:
+            _documents.popitem(last=False)[1].close()
+        return document
+
+
+def _iter_parsed(stream, path, workers, cache, digest, max_pages, known=()):
+    """Yield the pages after the known (already yielded) ones, caching everything read on the way out"""
+    reader = PyPDF2.PdfReader(stream)
+    total_pages = len(reader.pages)
+    limit = total_pages if max_pages is None else min(max_pages, total_pages)
+    start = len(known)
+    workers = workers or default_workers()
+
+    if workers < 2 or limit - start < PARALLEL_MIN_PAGES:
+        chunks = ([_extract_page(reader.pages[i])] for i in range(start, limit))
+    else:
+        chunks = _iter_parallel(reader, stream, path, limit, workers, start=start)
+
+    pages = list(known) if cache else None
+    try:
+        for chunk in chunks:
+            for page_text in chunk:
+                if pages is not None:
+                    pages.append(page_text)
+                yield page_text
+    finally:
+        # Cancel what's still queued on the pool before spending time on the cache
+        chunks.close()
+        if cache:
+            _store_read_pages(cache, digest, pages, total_pages, start)
+
+
+def _iter_parallel(reader, stream, path, limit, workers, start=0):
+    """Yield results for the page ranges from start to limit in order, keeping at most two per worker in flight"""
+    with (_spooled(stream) if path is None else nullcontext(path)) as pool_path:
+        ranges = deque((first + start, stop + start) for first, stop in page_ranges(limit - start, workers))
+        pending = deque()
+        next_page = start
+        try:
+            pool = get_pool(workers)
+            while ranges or pending:
+                while ranges and len(pending) < workers * 2:
+                    first, stop = ranges.popleft()
+                    pending.append((stop, pool.submit(_extract_range, pool_path, first, stop)))
+                stop, future = pending.popleft()
+                chunk = future.result()
+                next_page = stop
+                yield chunk
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); finish the document in-process
+            _reset_pool()
+            yield [_extract_page(reader.pages[i]) for i in range(next_page, limit)]
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def join_pages(pages):
+    """Join page texts the way the extractors always have: non-empty pages, newline-terminated"""
+    return "".join(page + "\n" for page in pages if page)
@@ -0,0 +1,173 @@
+"""Incremental analysis over the page stream from pdf_extraction.iter_pages"""
+from bisect import bisect_right
+from contextlib import nullcontext
+
+# Text from the previous pages re-scanned with each new page, so a match that
+# straddles a page break (label on one page, figure on the next) is still found.
+# A figure can follow its label across any amount of TRAILING_FILLER (blank lines,
+# and the '$' and ':' before it), so the tail is everything from the last line with
+# content - a same-line label can sit anywhere on it - or from OVERLAP_CHARS before
+# that line's end (for labels on earlier lines), whichever is longer. read_pages()
+# ends each page with a line break, so that is at most a page and its blank tail.
+OVERLAP_CHARS = 256
+TRAILING_FILLER = ' \t\n\r\f\v$:'
+
+
+def parse_figure(value_str):
+    """'$1,234.50' -> 1234.5, or None if it isn't a number"""
+    try:
+        return float(value_str.replace('$', '').replace(',', '').replace(' ', ''))
+    except ValueError:
+        return None
+
+
+def page_at(page_starts, offset):
+    """Page number holding offset, given ascending (start_offset, page_number) pairs"""
+    index = bisect_right(page_starts, (offset, float('inf'))) - 1
+    return page_starts[index][1] if index >= 0 else None
+
+
+class StreamingMetricExtractor:
+    """Metric extraction fed one page at a time.
+
+    patterns maps each metric to its MetricPattern - one of the tables in
+    metric_patterns.METRIC_PATTERNS. The result is the same as the front ends' one-shot
+    extraction over the text fed so far: a metric takes the first match of the
+    first pattern that matches anywhere. Once every metric has matched its
+    top-priority pattern nothing later in the document can change the result,
+    and complete becomes True. With lowercase set, text is lowercased before
+    matching (for case-sensitive lowercase patterns).
+
+    Each metric keeps where its figure was found: sources() gives the page (as
+    passed to feed) and the character offsets into the text fed so far.
+    """
+
+    def __init__(self, patterns, parse=parse_figure, lowercase=False):
+        self.patterns = patterns
+        self.parse = parse
+        self.lowercase = lowercase
+        self.found = {}
+        self.spent = {metric: set() for metric in self.patterns}
+        self.tail = ""
+        self.fed = 0
+        self.page_starts = []
+
+    def feed(self, text, page=None):
+        if self.lowercase:
+            text = text.lower()
+        if page is not None:
+            self.page_starts.append((self.fed, page))
+        window = self.tail + text
+        window_start = self.fed - len(self.tail)
+        self.fed += len(text)
+        for metric, pattern in self.patterns.items():
+            best = self.found[metric][0] if metric in self.found else len(pattern)
+            if best == 0:
+                continue
+            # Only a pattern's first match counts, whether or not it parses
+            hit = pattern.search(window, self.parse, limit=best, spent=self.spent[metric])
+            if hit:
+                priority, value, (start, end) = hit
+                self.found[metric] = (priority, value, {
+                    'value': value,
+                    'page': page_at(self.page_starts, window_start + start),
+                    'start': window_start + start,
+                    'end': window_start + end,
+                    'match': window[start:end],
+                })
+        content_end = len(window.rstrip(TRAILING_FILLER))
+        line_start = window.rfind('\n', 0, content_end) + 1
+        self.tail = window[max(0, min(line_start, content_end - OVERLAP_CHARS)):]
+
+    @property
+    def complete(self):
+        return all(metric in self.found and self.found[metric][0] == 0 for metric in self.patterns)
+
+    def metrics(self):
+        return {metric: self.found[metric][1] for metric in self.patterns if metric in self.found}
+
+    def sources(self):
+        """metric -> {'value', 'page', 'start', 'end', 'match'} for each metric found"""
+        return {metric: self.found[metric][2] for metric in self.patterns if metric in self.found}
+
+
+class SentenceCounter:
+    """Tells when a first-N-sentences summary of text fed a chunk at a time is final.
+
+    Counts the finished ('.'-terminated) sentences longer than min_length once
+    stripped; complete once there are sentences of them in at least 100
+    characters of text. Each feed() looks only at the new chunk - of the
+    unfinished sentence just its stripped length is kept - so a document
+    without full stops costs no more than any other.
+    """
+
+    def __init__(self, sentences=3, min_length=30):
+        self.sentences = sentences
+        self.min_length = min_length
+        self.length = 0
+        self.count = 0
+        self._open = 0      # Stripped length of the unfinished sentence
+        self._trailing = 0  # Whitespace after it so far
+
+    def feed(self, text):
+        self.length += len(text)
+        for i, piece in enumerate(text.split('.')):
+            if i:
+                self._finish()
+            self._extend(piece)
+
+    def _extend(self, piece):
+        core = piece.strip()
+        if not core:
+            if self._open:
+                self._trailing += len(piece)
+            return
+        if self._open:
+            self._open += self._trailing + len(piece) - len(piece.lstrip())
+        self._open += len(core)
+        self._trailing = len(piece) - len(piece.rstrip())
+
+    def _finish(self):
+        if self._open > self.min_length:
+            self.count += 1
+        self._open = self._trailing = 0
+
+    @property
+    def complete(self):
+        return self.length >= 100 and self.count >= self.sentences
+
+
+def read_pages(pages, extractor, summary=None, format_page=None, progress=None, feed_timer=None):
+    """Feed a page stream to extractor until the metrics and summary are settled.
+
+    format_page(page_number, page_text) builds each page's chunk of the document
+    text (default: the page followed by a newline). summary, if given, is fed
+    the chunks too and says when the summary is settled through its complete
+    property, as a SentenceCounter does. progress(pages_read, page_text), if
+    given, is called after each page has been analysed. feed_timer, a context
+    manager such as an instrumentation.StageTimer, is entered around each
+    extractor.feed(). The stream is closed on return, so an early stop cancels
+    any parsing still in flight. Returns (text, pages_read).
+    """
+    chunks = []
+    pages_read = 0
+    summary_done = summary is None
+    feed_timer = feed_timer or nullcontext()
+    try:
+        for pages_read, page_text in enumerate(pages, 1):
+            if page_text:
+                chunk = format_page(pages_read, page_text) if format_page else page_text + "\n"
+                chunks.append(chunk)
+                with feed_timer:
+                    extractor.feed(chunk, page=pages_read)
+                if not summary_done:
+                    summary.feed(chunk)
+                    summary_done = summary.complete
+            if progress:
+                progress(pages_read, page_text)
+            if summary_done and extractor.complete:
+                break
+    finally:
+        if hasattr(pages, 'close'):
+            pages.close()
+    return "".join(chunks), pages_read
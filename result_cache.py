@@ -0,0 +1,123 @@
+"""Analysis results cached by PDF hash: an in-memory LRU in front of a SQLite table"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Results kept in memory, and rows kept in the SQLite file (set the path to "" for memory only)
+RESULT_CACHE_ENTRIES = int(os.environ.get('FINANCIAL_ANALYZER_RESULT_CACHE_ENTRIES', 256))
+RESULT_DB_PATH = os.environ.get('FINANCIAL_ANALYZER_RESULT_DB',
+                                os.path.join(os.path.expanduser('~'), '.cache', 'financial_analyzer', 'results.sqlite3'))
+RESULT_DB_ROWS = int(os.environ.get('FINANCIAL_ANALYZER_RESULT_DB_ROWS', 10000))
+
+
+def result_key(digest, version):
+    """Cache key for the analysis of the PDF with SHA-256 digest by analyzer version"""
+    return f'{digest}-{version}'
+
+
+class ResultCache:
+    """Two-tier result cache.
+
+    get() looks in the in-memory LRU first, then in the SQLite table (promoting
+    what it finds there); put() writes both. The table is trimmed to max_rows
+    least-recently-used rows, and is opened in WAL mode so several server
+    processes can share one file. Results are stored as JSON, so they must be
+    JSON-serialisable - they are what the endpoints return anyway.
+
+    Hits and misses are counted per tier; stats() reports them.
+    """
+
+    def __init__(self, path=RESULT_DB_PATH, max_entries=RESULT_CACHE_ENTRIES, max_rows=RESULT_DB_ROWS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+                self._db.execute('PRAGMA journal_mode=WAL')
+                self._db.execute('CREATE TABLE IF NOT EXISTS results '
+                                 '(key TEXT PRIMARY KEY, result TEXT NOT NULL, used REAL NOT NULL)')
+            except (OSError, sqlite3.Error) as e:
+                print(f"Result cache database unavailable, keeping results in memory only: {e}")
+                self._db = None
+
+    def get(self, key):
+        """The cached result for key, or None"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return json.loads(data)
+            row = self._select(key)
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, row[0])
+            return json.loads(row[0])
+
+    def put(self, key, result):
+        data = json.dumps(result)
+        with self._lock:
+            self._remember(key, data)
+            if self._db is None:
+                return
+            try:
+                self._db.execute('INSERT OR REPLACE INTO results (key, result, used) VALUES (?, ?, ?)',
+                                 (key, data, time.time()))
+                self._db.execute('DELETE FROM results WHERE key NOT IN '
+                                 '(SELECT key FROM results ORDER BY used DESC LIMIT ?)', (self.max_rows,))
+            except sqlite3.Error as e:
+                print(f"Result cache write failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_entries': len(self._memory),
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def _select(self, key):
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute('SELECT result FROM results WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self._db.execute('UPDATE results SET used = ? WHERE key = ?', (time.time(), key))
+            return row
+        except sqlite3.Error:
+            return None
+
+    def _remember(self, key, data):
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def result_cache():
+    """The shared result cache"""
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache()
+        return _result_cache
@@ -0,0 +1,130 @@
+"""Production server: the web app on a preforked gunicorn server.
+
+    python serve.py --workers 4 --bind 0.0.0.0:5000
+
+Each worker process serves requests on a few threads, since event streams and
+batch responses hold their connection open while they run. The app is
+imported once in the master and forked, and every worker renders a throwaway
+chart before it takes requests, so the first upload it sees doesn't pay for
+matplotlib's backend and font setup.
+
+Admission control (admission.py) counts the analyses of one process, so the
+FINANCIAL_ANALYZER_MAX_IN_FLIGHT and FINANCIAL_ANALYZER_MAX_WAITING budgets
+are split evenly between the workers - at least one of each per worker -
+rather than every worker getting the whole of them.
+
+kill -HUP <master pid> replaces the workers gracefully - each finishes its
+in-flight requests first. With --no-preload the new workers also pick up code
+changes. `python app.py` is still the development server.
+
+A scrape of /metrics lands on any one worker, so the workers pool their
+metrics in FINANCIAL_ANALYZER_METRICS_DIR (a fresh temporary directory unless
+set; emptied of an earlier server's snapshots at start) and each /metrics
+response adds up all of them.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+SERVE_BIND = os.environ.get('FINANCIAL_ANALYZER_BIND', '0.0.0.0:5000')
+SERVE_WORKERS = int(os.environ.get('FINANCIAL_ANALYZER_SERVE_WORKERS', 0)) or (os.cpu_count() or 1)
+SERVE_THREADS = int(os.environ.get('FINANCIAL_ANALYZER_SERVE_THREADS', 8))
+# Jobs are polled through whichever worker a request lands on, so workers share them through this file
+DEFAULT_JOB_DB = os.path.join(os.path.expanduser('~'), '.cache', 'financial_analyzer', 'jobs.sqlite3')
+
+
+def metrics_dir():
+    """The directory the workers share their metrics through, with no snapshots left from an earlier run"""
+    directory = os.environ.get('FINANCIAL_ANALYZER_METRICS_DIR') or tempfile.mkdtemp(prefix='financial_analyzer_metrics_')
+    os.makedirs(directory, exist_ok=True)
+    for entry in os.scandir(directory):
+        if entry.name.endswith('.json'):
+            os.unlink(entry.path)
+    return directory
+
+
+def preload():
+    """Import what the app otherwise loads on first use, so forked workers share it"""
+    import PyPDF2  # noqa: F401
+    import matplotlib.figure  # noqa: F401
+    from matplotlib.backends import backend_agg  # noqa: F401
+
+
+def split_admission(admission, workers):
+    """Cut the app's admission controller down to one worker's share of the server-wide budgets"""
+    admission.max_in_flight = max(1, admission.max_in_flight // workers)
+    admission.max_waiting = max(1, admission.max_waiting // workers)
+
+
+def warm_up():
+    """Per-process setup that the first request would otherwise pay for"""
+    from chart_renderer import render_chart
+    from result_cache import result_cache
+    render_chart('metrics_bar', {'revenue': 1.0, 'net_income': 0.5}, dpi=150)
+    result_cache()
+
+
+def post_fork(server, worker):
+    warm_up()
+    server.log.info("Worker %s warmed up", worker.pid)
+
+
+def server_options(args):
+    options = {
+        'bind': args.bind,
+        'workers': args.workers,
+        'worker_class': 'gthread',
+        'threads': args.threads,
+        'preload_app': args.preload,
+        'timeout': args.timeout,
+        'graceful_timeout': args.timeout,
+        'post_fork': post_fork,
+    }
+    if args.access_log:
+        options['accesslog'] = '-'
+    return options
+
+
+def run(options):
+    from gunicorn.app.base import BaseApplication
+
+    class AnalyzerServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import admission, app
+            preload()
+            split_admission(admission, options['workers'])
+            return app
+
+    AnalyzerServer().run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bind', default=SERVE_BIND)
+    parser.add_argument('--workers', type=int, default=SERVE_WORKERS)
+    parser.add_argument('--threads', type=int, default=SERVE_THREADS)
+    parser.add_argument('--timeout', type=int, default=120)
+    parser.add_argument('--no-preload', dest='preload', action='store_false',
+                        help="import the app in each worker, so HUP reloads code too")
+    parser.add_argument('--access-log', action='store_true')
+    args = parser.parse_args()
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        sys.exit("serve.py needs gunicorn (pip install gunicorn, Linux/macOS only); "
+                 "use `python app.py` for the development server")
+
+    if args.workers > 1:
+        os.environ.setdefault('FINANCIAL_ANALYZER_JOB_DB', DEFAULT_JOB_DB)
+        os.environ['FINANCIAL_ANALYZER_METRICS_DIR'] = metrics_dir()
+    run(server_options(args))
+
+
+if __name__ == '__main__':
+    main()
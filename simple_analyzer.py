@@ -1,21 +1,22 @@
-import PyPDF2
-import re
-import matplotlib.pyplot as plt
 import os
+from instrumentation import StageTimer, record_document, stage, write_textfile
+from lazy_import import lazy_import
+from pdf_extraction import PAGE_BUDGET, extract_pages, iter_pages, join_pages
+from metric_patterns import METRIC_PATTERNS
+from report_stream import SentenceCounter, StreamingMetricExtractor, read_pages
+
+plt = lazy_import('matplotlib.pyplot')
+
+# Where analyze_file() leaves its stage timings (Prometheus text format), if set
+METRICS_FILE = os.environ.get('FINANCIAL_ANALYZER_METRICS_FILE')
 
 def extract_text_from_file(file_path):
     """Extract text from PDF or TXT file"""
     try:
         if file_path.lower().endswith('.pdf'):
             # PDF file
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-                return text if text.strip() else "No readable text found in PDF"
+            text = join_pages(extract_pages(file_path))
+            return text if text.strip() else "No readable text found in PDF"
         
         elif file_path.lower().endswith('.txt'):
             # Text file
@@ -28,31 +29,29 @@ def extract_text_from_file(file_path):
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
+def read_pdf(file_path):
+    """Stream a PDF page by page, stopping once the metrics and summary are settled"""
+    extractor = StreamingMetricExtractor(METRIC_PATTERNS['cli'])
+    extract_timer = StageTimer('extract_text')
+    metrics_timer = StageTimer('extract_metrics')
+    pages_read = 0
+    try:
+        pages = extract_timer.iterate(iter_pages(file_path, max_pages=PAGE_BUDGET))
+        text, pages_read = read_pages(pages, extractor, summary=SentenceCounter(), feed_timer=metrics_timer)
+        if not text.strip():
+            text = "No readable text found in PDF"
+    except Exception as e:
+        text = f"Error reading file: {str(e)}"
+    extract_timer.record()
+    metrics_timer.record()
+    record_document(file_path, pages_read, extract_timer.elapsed)
+    return text, extractor.metrics()
+
 def extract_financial_metrics(text):
     """Extract financial metrics from text"""
-    metrics = {}
-    
-    financial_terms = {
-        'revenue': [r'revenue.*?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)', 
-                   r'sales.*?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'],
-        'net_income': [r'net income.*?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                      r'net profit.*?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'],
-        'assets': [r'total assets.*?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'],
-        'profit': [r'profit.*?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'],
-        'ebitda': [r'ebitda.*?[\$]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)']
-    }
-    
-    for metric, patterns in financial_terms.items():
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                try:
-                    value = float(matches[0].replace(',', '').replace('$', ''))
-                    metrics[metric] = value
-                    break
-                except:
-                    continue
-    return metrics
+    extractor = StreamingMetricExtractor(METRIC_PATTERNS['cli'])
+    extractor.feed(text)
+    return extractor.metrics()
 
 def generate_summary(text):
     """Generate summary from text"""
@@ -134,12 +133,18 @@ def analyze_file(file_path):
     print("-" * 60)
     
     # Extract text
-    text = extract_text_from_file(file_path)
+    if file_path.lower().endswith('.pdf'):
+        text, metrics = read_pdf(file_path)
+    else:
+        with stage('extract_text'):
+            text = extract_text_from_file(file_path)
+        with stage('extract_metrics'):
+            metrics = extract_financial_metrics(text)
     print(f"📄 Text extracted: {len(text)} characters")
     
     # Generate analysis
-    summary = generate_summary(text)
-    metrics = extract_financial_metrics(text)
+    with stage('generate_summary'):
+        summary = generate_summary(text)
     
     # Display results
     print("\n📋 EXECUTIVE SUMMARY:")
@@ -157,11 +162,18 @@ def analyze_file(file_path):
     
     # Create chart
     if metrics:
-        chart_file = create_chart(metrics)
+        with stage('create_chart'):
+            chart_file = create_chart(metrics)
         if chart_file:
             print(f"\n📈 Chart created: {chart_file}")
             print("💡 Open the PNG file to view the visualization")
     
+    if METRICS_FILE:
+        try:
+            write_textfile(METRICS_FILE)
+        except OSError as e:
+            print(f"Could not write metrics: {e}")
+    
     print("\n" + "=" * 60)
     print("✅ Analysis complete!")
 